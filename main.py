@@ -1,12 +1,14 @@
-from fastapi import FastAPI, File, UploadFile, Request
-from fastapi.responses import JSONResponse, HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, File, UploadFile, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, HTMLResponse, Response, FileResponse, StreamingResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from pathlib import Path
-import shutil
 import uuid
 import os
+import json
+import asyncio
+import math
+import time
 from dotenv import load_dotenv
 
 # --- Load .env before importing any services ---
@@ -21,9 +23,30 @@ print("ASSEMBLYAI_API_KEY =", os.getenv("ASSEMBLYAI_API_KEY"))
 print("MURF_API_KEY =", os.getenv("MURF_API_KEY"))'''
 
 # --- Now import services ---
-from services.tts_service import generate_murf_audio, download_url_to_file
-from services.stt_service import transcribe_with_assemblyai
-from services.llm_service import query_gemini
+from services.tts_service import generate_murf_audio, register_tts_stream, open_tts_stream
+from services.stt_service import (
+    transcribe_audio_data, notify_transcript_ready, ASSEMBLYAI_WEBHOOK_SECRET, WEBHOOK_AUTH_HEADER,
+)
+from services.llm_service import query_gemini_async, stream_gemini, get_llm_stats, GEMINI_MODEL
+from services.http_client import init_http_session, close_http_session
+from services.tts_cache import tts_cache
+from services.storage_manager import StorageManager, ManagedDir
+from services.history_store import ChatHistoryRepository
+from services.history_manager import HistoryManager
+from services.response_cache import ResponseCache
+from services.fallback_audio import FallbackAudio
+from services.phrase_bank import PhraseBank, FILLER_ENABLED, FILLER_MIN_LATENCY
+from services.latency import EWMA
+from services.audio_preprocess import audio_preprocessor
+from services.provider_limits import get_provider_limits
+from services.circuit_breaker import get_breakers
+from services.hedging import get_hedgers
+from services.deadline import Deadline, DeadlineExceeded, TURN_DEADLINE, TURN_LLM_RESERVE, TURN_TTS_RESERVE
+from services.turn_control import SessionTurnLocks, AdmissionController, Overloaded
+from services.audio_serving import AudioStaticFiles, bytes_response, immutable
+from services.audio_framing import INLINE_AUDIO_MEDIA_TYPE, pack_audio_frame, wants_inline_audio
+from services.voice_pipeline import segment_stream, synthesize_in_order, read_local_audio
+from services.stt_streaming import get_stt_engine, STTEngine, REALTIME_SAMPLE_RATE, MAX_UTTERANCE_BYTES
 
 app = FastAPI()
 
@@ -33,23 +56,91 @@ TEMPLATES_DIR = BASE_DIR / "templates"
 for d in [UPLOAD_DIR, STATIC_DIR, TEMPLATES_DIR]:
     d.mkdir(exist_ok=True)
 
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
+storage = StorageManager()
+storage.add(ManagedDir(
+    "uploads", UPLOAD_DIR,
+    max_bytes=int(os.getenv("UPLOADS_MAX_BYTES", str(1024 * 1024 * 1024))),
+    max_files=int(os.getenv("UPLOADS_MAX_FILES", "20000")),
+    ttl=float(os.getenv("UPLOADS_TTL", str(24 * 3600))),
+))
+# Per-request Murf files written to static/ before the TTS cache existed
+storage.add(ManagedDir("static_audio", STATIC_DIR, pattern="murf_*.mp3", recursive=False, ttl=24 * 3600))
 
-FALLBACK_AUDIO_FILE = STATIC_DIR / "fallback_audio.mp3"
-FALLBACK_TEXT = "I'm having trouble connecting right now. Please try again later."
-chat_history_store = {}
+# Generated audio and uploads never change under a given name, so browsers and CDNs may keep them
+app.mount("/static", AudioStaticFiles(directory=STATIC_DIR, cache_rules=[
+    ("tts_cache/*/*.mp3", immutable()),
+    ("murf_*.mp3", immutable()),
+], etag_for=lambda path: tts_cache.etag(path.stem)), name="static")
+app.mount("/uploads", AudioStaticFiles(directory=UPLOAD_DIR, cache_rules=[
+    ("*", immutable(private=True)),
+]), name="uploads")
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
-async def ensure_fallback_audio():
-    if not FALLBACK_AUDIO_FILE.exists():
-        audio_url = await generate_murf_audio(FALLBACK_TEXT, voice_id="en-IN-aarav")
-        if audio_url and not audio_url.startswith("/static/"):
-            await download_url_to_file(audio_url, FALLBACK_AUDIO_FILE)
+# Keep a copy of each uploaded utterance under uploads/ (written in the background)
+ARCHIVE_UPLOADS = os.getenv("ARCHIVE_UPLOADS", "0") == "1"
+UPLOAD_CHUNK_SIZE = 64 * 1024
+SYSTEM_PROMPT = "You are a helpful assistant that always replies in English.\nContinue the conversation naturally."
+LLM_FAILURE_TEXT = "I'm having trouble connecting to the language model right now."
+history = ChatHistoryRepository()
+# Bounds prompt size per turn; older turns are folded into a summary in the background
+history_window = HistoryManager(summarize=query_gemini_async)
+llm_response_cache = ResponseCache()
+# Fallback clips are loaded (or synthesized) by a background warm-up, never on the startup path
+fallback = FallbackAudio()
+DEFAULT_VOICE_ID = "en-IN-aarav"
+filler_bank = PhraseBank()
+# Turns of one session run one at a time, in arrival order; all turns share a global in-flight cap.
+# The session lock is taken first, so a turn queued behind its session never holds an idle slot.
+# Both waits are bounded by the turn's deadline: a turn that spends its budget queueing is shed.
+turn_locks = SessionTurnLocks()
+admission = AdmissionController()
+# Final transcript -> first reply audio on the socket; decides whether a filler is worth sending
+first_audio_latency = EWMA()
+# Turns that ran out of their TURN_DEADLINE budget and went out degraded
+deadline_stats = {"turns": 0, "expired": 0}
 
 @app.on_event("startup")
 async def startup_event():
-    await ensure_fallback_audio()
+    await init_http_session()
+    history.start()
+    storage.start()
+    fallback.start()
+    if FILLER_ENABLED:
+        filler_bank.warm(DEFAULT_VOICE_ID)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await fallback.stop()
+    await storage.stop()
+    await asyncio.to_thread(history.stop)
+    await close_http_session()
+    audio_preprocessor.shutdown()
+
+async def read_upload_chunks(audio_file: UploadFile):
+    """Yield the (spooled) upload body in chunks without blocking the event loop."""
+    while chunk := await audio_file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+def build_messages(session_id: str, messages: list[dict]) -> tuple[str, list[dict]]:
+    """System instruction (with the rolling summary) and the verbatim turns for the next LLM call."""
+    summary, recent = history_window.window(session_id, messages)
+    system_instruction = SYSTEM_PROMPT
+    if summary:
+        system_instruction += f"\n\nSummary of the earlier conversation:\n{summary}"
+    return system_instruction, recent
+
+async def load_audio_bytes(audio_url: str | None) -> bytes | None:
+    """Bytes behind a local audio URL: a TTS cache file or an in-memory fallback clip."""
+    if audio_url and audio_url.startswith("/audio/fallback/"):
+        return fallback.get(audio_url[len("/audio/fallback/"):].split("?", 1)[0])
+    return await read_local_audio(audio_url)
+
+async def inline_audio_response(payload: dict) -> Response:
+    """Send payload and its audio in one framed body; audio_url stays set only if the bytes are not local."""
+    audio = await load_audio_bytes(payload.get("audio_url"))
+    if audio:
+        payload = {**payload, "audio_url": None}
+    return Response(pack_audio_frame(payload, audio), media_type=INLINE_AUDIO_MEDIA_TYPE)
 
 class TTSRequest(BaseModel):
     text: str
@@ -63,61 +154,325 @@ async def serve_index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.post("/generate-audio")
-async def generate_audio_endpoint(req: TTSRequest):
-    voice = req.voice_id or "en-IN-aarav"
-    audio_url = await generate_murf_audio(req.text, voice_id=voice)
+async def generate_audio_endpoint(req: TTSRequest, request: Request, audio: str = "url"):
+    voice = req.voice_id or DEFAULT_VOICE_ID
+    audio_url = await generate_murf_audio(req.text, voice_id=voice) or fallback.url()
     if not audio_url:
-        if FALLBACK_AUDIO_FILE.exists():
-            return {"audio_url": f"/static/{FALLBACK_AUDIO_FILE.name}"}
         return JSONResponse({"detail": "TTS failed"}, status_code=500)
+    if wants_inline_audio(request.headers.get("accept"), audio):
+        return await inline_audio_response({"audio_url": audio_url})
     return {"audio_url": audio_url}
 
+def overloaded_response(e: Overloaded) -> JSONResponse:
+    return JSONResponse({"detail": "Server busy, retry later"}, status_code=429,
+                        headers={"Retry-After": e.retry_after_header})
+
+def queue_timeout_response() -> JSONResponse:
+    """The turn spent the budget its first stage needed waiting for its session or a slot."""
+    retry_after = max(1, math.ceil(admission.latency.get(default=1.0)))
+    return JSONResponse({"detail": "Server busy, retry later"}, status_code=503,
+                        headers={"Retry-After": str(retry_after)})
+
 @app.post("/agent/chat/{session_id}")
-async def agent_chat(session_id: str, audio_file: UploadFile = File(...)):
-    incoming_name = f"{uuid.uuid4().hex}_{audio_file.filename}"
-    saved_path = UPLOAD_DIR / incoming_name
-    with open(saved_path, "wb") as out_f:
-        shutil.copyfileobj(audio_file.file, out_f)
+async def agent_chat(session_id: str, request: Request, audio_file: UploadFile = File(...), audio: str = "url"):
+    """
+    One voice turn from an uploaded utterance. `audio` selects how the reply
+    audio is delivered: "url" (synthesized before responding), "stream"
+    (a /tts/stream/ URL that synthesizes while the client plays it) or
+    "inline" (audio bytes framed into this response; also chosen by Accept).
+    The whole turn, including any wait for admission, runs against one
+    TURN_DEADLINE budget; a turn with no STT budget left once admitted gets 503.
+    """
+    deadline = Deadline.after(TURN_DEADLINE)
+    # Each stage gets what is left minus what the later stages are guaranteed
+    stt_deadline = deadline.reserve(TURN_LLM_RESERVE + TURN_TTS_RESERVE)
+    inline = wants_inline_audio(request.headers.get("accept"), audio)
+    try:
+        async with turn_locks.hold(session_id, stt_deadline), admission.admit(stt_deadline):
+            stt_deadline.check()
+            return await chat_turn(session_id, audio_file, audio, inline, deadline, stt_deadline)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except DeadlineExceeded:
+        return queue_timeout_response()
+    finally:
+        deadline_stats["turns"] += 1
+        deadline_stats["expired"] += deadline.expired
 
-    transcript = await transcribe_with_assemblyai(str(saved_path))
+async def chat_turn(session_id: str, audio_file: UploadFile, audio: str, inline: bool, deadline: Deadline,
+                    stt_deadline: Deadline):
+    if audio_preprocessor.enabled:
+        # Mono 16 kHz Opus with silence trimmed: a fraction of the browser's upload
+        upload, audio_seconds = await audio_preprocessor.normalize(await audio_file.read())
+        transcript = await transcribe_audio_data(upload, audio_seconds=audio_seconds, deadline=stt_deadline)
+    else:
+        # The upload body is streamed straight into the STT request; nothing touches disk on the hot path
+        transcript = await transcribe_audio_data(read_upload_chunks(audio_file), size_hint=audio_file.size,
+                                                 deadline=stt_deadline)
+    if ARCHIVE_UPLOADS:
+        await audio_file.seek(0)
+        storage.write_in_background("uploads", f"{uuid.uuid4().hex}_{audio_file.filename}", await audio_file.read())
     if not transcript:
-        return {
+        payload = {
             "session_id": session_id,
             "transcription": None,
             "llm_text": None,
-            "audio_url": f"/static/{FALLBACK_AUDIO_FILE.name}",
+            "audio_url": fallback.url("stt_failed"),
             "error": "STT failed"
         }
+        return await inline_audio_response(payload) if inline else payload
 
-    chat_history_store.setdefault(session_id, []).append({"role": "user", "content": transcript})
-
-    history_text = "\n".join(f"{msg['role'].capitalize()}: {msg['content']}" for msg in chat_history_store[session_id])
-    prompt = (
-        "You are a helpful assistant that always replies in English.\n"
-        "Continue the conversation naturally.\n\n"
-        f"{history_text}\nAssistant:"
-    )
+    await history.append(session_id, "user", transcript)
+    messages = await history.get(session_id)
 
-    llm_text = query_gemini(prompt) or "I'm having trouble connecting to the language model right now."
-    chat_history_store[session_id].append({"role": "assistant", "content": llm_text})
+    system_instruction, recent = build_messages(session_id, messages)
+    llm_text = await query_gemini_async(recent, system_instruction=system_instruction, session_id=session_id,
+                                        deadline=deadline.reserve(TURN_TTS_RESERVE)) or LLM_FAILURE_TEXT
+    await history.append(session_id, "assistant", llm_text)
+    messages.append({"role": "assistant", "content": llm_text})
 
-    audio_url = await generate_murf_audio(llm_text) or f"/static/{FALLBACK_AUDIO_FILE.name}"
-
-    return {
+    payload = {
         "session_id": session_id,
         "transcription": transcript,
         "llm_text": llm_text,
-        "audio_url": audio_url,
-        "history": chat_history_store[session_id]
+        "audio_url": None,
+        "history": messages
     }
+    if audio == "stream" and not inline:
+        payload["audio_url"] = register_tts_stream(llm_text, DEFAULT_VOICE_ID)
+    else:
+        # A cached clip is still served once the budget is spent
+        payload["audio_url"] = await generate_murf_audio(llm_text, voice_id=DEFAULT_VOICE_ID, deadline=deadline)
+    if not payload["audio_url"]:
+        if deadline.expired:
+            # Out of time for TTS: the client speaks the reply text itself
+            payload["fallback_text"] = llm_text
+        else:
+            payload["audio_url"] = fallback.url()
+    return await inline_audio_response(payload) if inline else payload
+
+async def stream_transcript(websocket: WebSocket, engine: STTEngine, audio_queue: asyncio.Queue,
+                            deadline: Deadline) -> str:
+    """Feed queued microphone chunks to the STT engine, relaying partial transcripts."""
+    async def chunks():
+        while (chunk := await audio_queue.get()) is not None:
+            yield chunk
+
+    transcript = ""
+    async for event in engine.transcribe_stream(chunks(), deadline):
+        if event.final:
+            transcript = event.text
+        elif event.text:
+            await websocket.send_json({"type": "transcript", "final": False, "text": event.text})
+    return transcript
+
+async def run_streaming_turn(websocket: WebSocket, session_id: str, transcript: str, deadline: Deadline):
+    """
+    Finish one voice turn over the socket: stream the LLM reply for the final
+    transcript and push each sentence's audio as soon as it is synthesized.
+    Sentences that cannot be synthesized before `deadline` go out as text.
+    """
+    if not transcript:
+        await websocket.send_json({"type": "error", "error": "STT failed", "audio_url": fallback.url("stt_failed")})
+        return
+    await websocket.send_json({"type": "transcript", "final": True, "text": transcript})
+    turn_started = time.monotonic()
+    if FILLER_ENABLED and first_audio_latency.get(default=FILLER_MIN_LATENCY) >= FILLER_MIN_LATENCY:
+        # Masks the wait for the first sentence; costs no provider call
+        filler = filler_bank.pick(DEFAULT_VOICE_ID)
+        if filler:
+            await websocket.send_json({"type": "filler", "text": filler[0], "mime": "audio/mpeg"})
+            await websocket.send_bytes(filler[1])
+
+    await history.append(session_id, "user", transcript)
+    system_instruction, recent = build_messages(session_id, await history.get(session_id))
+    reply_parts: list[str] = []
+
+    async def llm_deltas():
+        async for delta in stream_gemini(recent, system_instruction=system_instruction, session_id=session_id,
+                                         deadline=deadline.reserve(TURN_TTS_RESERVE)):
+            reply_parts.append(delta)
+            await websocket.send_json({"type": "llm_delta", "text": delta})
+            yield delta
+        if not reply_parts:
+            yield LLM_FAILURE_TEXT
+
+    # Each completed sentence goes to TTS while the LLM is still generating the rest
+    async for index, sentence, audio_url in synthesize_in_order(segment_stream(llm_deltas()), DEFAULT_VOICE_ID, deadline):
+        if index == 0:
+            first_audio_latency.update(time.monotonic() - turn_started)
+        data = await read_local_audio(audio_url)
+        if data:
+            await websocket.send_json({"type": "audio", "index": index, "text": sentence, "mime": "audio/mpeg"})
+            await websocket.send_bytes(data)
+        else:
+            # Remote URL (local download failed) or no audio at all; the client speaks the text itself
+            await websocket.send_json({"type": "audio", "index": index, "text": sentence, "url": audio_url})
+
+    llm_text = "".join(reply_parts).strip() or LLM_FAILURE_TEXT
+    await history.append(session_id, "assistant", llm_text)
+    await websocket.send_json({"type": "llm_text", "text": llm_text})
+    await websocket.send_json({"type": "done"})
+
+@app.websocket("/ws/agent/{session_id}")
+async def agent_stream(websocket: WebSocket, session_id: str):
+    """
+    Streaming voice turns. Binary frames are microphone chunks of the current
+    utterance in the format announced by the "ready" message; they are fed to
+    the STT engine as they arrive. A {"type": "end"} text frame marks end of
+    speech and starts the LLM/TTS part of the turn. An utterance larger than
+    MAX_UTTERANCE_BYTES closes the socket.
+    """
+    engine = get_stt_engine()
+    await websocket.accept()
+    await websocket.send_json({"type": "ready", "audio_format": engine.audio_format, "sample_rate": REALTIME_SAMPLE_RATE})
+    audio_queue: asyncio.Queue | None = None
+    transcriber: asyncio.Task | None = None
+    stt_deadline: Deadline | None = None
+    utterance_bytes = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                if transcriber is None:
+                    audio_queue = asyncio.Queue()
+                    # Unbounded while the user speaks; set once the turn's budget starts at end of speech
+                    stt_deadline = Deadline()
+                    transcriber = asyncio.create_task(stream_transcript(websocket, engine, audio_queue, stt_deadline))
+                    utterance_bytes = 0
+                utterance_bytes += len(message["bytes"])
+                if utterance_bytes > MAX_UTTERANCE_BYTES:
+                    # A client that never sends "end" must not grow server memory without limit
+                    await websocket.send_json({"type": "error", "error": "Utterance too long"})
+                    await websocket.close(code=1009)
+                    break
+                audio_queue.put_nowait(message["bytes"])
+                continue
+            if not message.get("text"):
+                continue
+            try:
+                event = json.loads(message["text"])
+            except ValueError:
+                continue
+            if event.get("type") == "end":
+                if transcriber is None:
+                    await websocket.send_json({"type": "done"})
+                    continue
+                # Speech has ended: the turn's budget starts now
+                deadline = Deadline.after(TURN_DEADLINE)
+                stt_deadline.expires_at = deadline.reserve(TURN_LLM_RESERVE + TURN_TTS_RESERVE).expires_at
+                audio_queue.put_nowait(None)
+                transcript = await transcriber
+                transcriber = None
+                try:
+                    llm_deadline = deadline.reserve(TURN_TTS_RESERVE)
+                    async with turn_locks.hold(session_id, llm_deadline), admission.admit(llm_deadline):
+                        llm_deadline.check()
+                        await run_streaming_turn(websocket, session_id, transcript, deadline)
+                except Overloaded as e:
+                    await websocket.send_json({"type": "error", "error": "Server busy, retry later",
+                                               "retry_after": e.retry_after})
+                except DeadlineExceeded:
+                    await websocket.send_json({"type": "error", "error": "Server busy, retry later",
+                                               "retry_after": max(1.0, admission.latency.get(default=1.0))})
+                finally:
+                    deadline_stats["turns"] += 1
+                    deadline_stats["expired"] += deadline.expired
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if transcriber is not None:
+            transcriber.cancel()
+
+@app.get("/tts/stream/{key}")
+async def tts_stream(key: str, request: Request, t: str | None = None):
+    """Reply audio piped from Murf's streaming API as it is synthesized (chunked transfer)."""
+    cached = tts_cache.lookup(key)
+    if cached:
+        # The key addresses the (text, voice) request; the ETag hashes the bytes actually stored
+        headers = {"Cache-Control": immutable()}
+        etag = tts_cache.etag(key)
+        if etag:
+            headers["ETag"] = f'"{etag}"'
+            if request.headers.get("if-none-match") == headers["ETag"]:
+                return Response(status_code=304, headers=headers)
+        return FileResponse(STATIC_DIR / cached[len("/static/"):], media_type="audio/mpeg", headers=headers)
+    stream = await open_tts_stream(key, t)
+    if stream is None:
+        if fallback.url():
+            return RedirectResponse(fallback.url())
+        return JSONResponse({"detail": "TTS failed"}, status_code=502)
+    return StreamingResponse(stream, media_type="audio/mpeg")
+
+@app.post("/stt/webhook")
+async def stt_webhook(request: Request):
+    """AssemblyAI completion webhook: wakes the coroutine waiting on the transcript."""
+    if ASSEMBLYAI_WEBHOOK_SECRET and request.headers.get(WEBHOOK_AUTH_HEADER) != ASSEMBLYAI_WEBHOOK_SECRET:
+        return JSONResponse({"detail": "Invalid webhook secret"}, status_code=401)
+    body = await request.json()
+    transcript_id = body.get("transcript_id")
+    if not transcript_id:
+        return JSONResponse({"detail": "transcript_id missing"}, status_code=400)
+    # False when the waiter lives in another worker; its adaptive polls pick the result up
+    woke = notify_transcript_ready(transcript_id, body.get("status"))
+    return {"transcript_id": transcript_id, "delivered": woke}
 
 @app.post("/llm/query")
 async def llm_query_endpoint(body: LLMQuery):
-    llm_response = query_gemini(body.text)
+    cache_key = llm_response_cache.make_key(body.text, model=GEMINI_MODEL)
+    llm_response = await llm_response_cache.get_or_compute(cache_key, lambda: query_gemini_async(body.text))
     if llm_response is None:
         return JSONResponse({"error": "LLM call failed"}, status_code=500)
     return {"response": llm_response}
 
 @app.get("/chat/history/{session_id}")
-def get_history(session_id: str):
-    return {"session_id": session_id, "history": chat_history_store.get(session_id, [])}
+async def get_history(session_id: str):
+    return {"session_id": session_id, "history": await history.get(session_id)}
+
+@app.get("/audio/fallback/{name}")
+async def fallback_clip(name: str, request: Request, v: str | None = None):
+    """Fallback clips are served from memory; versioned URLs (?v=<etag prefix>) are immutable."""
+    name = fallback.resolve(name)
+    if name is None:
+        return JSONResponse({"detail": "Fallback audio not available"}, status_code=404)
+    etag = fallback.etags[name]
+    cache_control = immutable() if v and len(v) >= 8 and etag.startswith(v) else "no-cache"
+    return bytes_response(request, fallback.clips[name], etag, cache_control=cache_control)
+
+@app.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def health_ready():
+    """503 until the fallback warm-up has finished loading what it can from disk."""
+    body = {"ready": fallback.ready, "fallback": fallback.status()}
+    return body if fallback.ready else JSONResponse(body, status_code=503)
+
+@app.get("/health/providers")
+async def health_providers():
+    """Circuit breaker state per provider; an open breaker means turns are degrading to fallbacks."""
+    breakers = get_breakers()
+    return {"degraded": any(b["state"] != "closed" for b in breakers.values()), "breakers": breakers}
+
+@app.get("/metrics")
+def get_metrics():
+    return {
+        "llm": get_llm_stats(),
+        "llm_response_cache": llm_response_cache.snapshot(),
+        "tts_cache": tts_cache.snapshot(),
+        "storage": storage.footprint(),
+        "history": history.snapshot(),
+        "history_window": history_window.snapshot(),
+        "fallback_audio": fallback.status(),
+        "audio_preprocess": audio_preprocessor.snapshot(),
+        "providers": get_provider_limits(),
+        "breakers": get_breakers(),
+        "hedging": get_hedgers(),
+        "admission": admission.snapshot(),
+        "turn_locks": turn_locks.snapshot(),
+        "turn_deadline": {**deadline_stats, "budget": TURN_DEADLINE},
+        "fillers": {**filler_bank.snapshot(), "first_audio_latency": first_audio_latency.snapshot()},
+    }
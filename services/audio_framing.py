@@ -0,0 +1,16 @@
+import json
+import struct
+
+# Response body: 4-byte big-endian JSON length, the JSON metadata, then the audio bytes.
+# Requested with ?audio=inline or an Accept header containing this media type.
+INLINE_AUDIO_MEDIA_TYPE = "application/vnd.voice-agent.audio-frame"
+_LENGTH = struct.Struct(">I")
+
+def pack_audio_frame(metadata: dict, audio: bytes | None, mime: str = "audio/mpeg") -> bytes:
+    """Metadata gains audio_bytes/audio_mime so the client knows where the audio is."""
+    audio = audio or b""
+    header = json.dumps({**metadata, "audio_bytes": len(audio), "audio_mime": mime if audio else None}).encode("utf-8")
+    return _LENGTH.pack(len(header)) + header + audio
+
+def wants_inline_audio(accept: str | None, audio: str | None = None) -> bool:
+    return audio == "inline" or INLINE_AUDIO_MEDIA_TYPE in (accept or "")
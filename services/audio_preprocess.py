@@ -0,0 +1,136 @@
+import os
+import time
+import shutil
+import asyncio
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # silence trimming is skipped without NumPy
+    np = None
+
+# "auto": on when ffmpeg is installed; "0": always off
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "auto")
+FFMPEG_PATH = shutil.which(os.getenv("FFMPEG_BINARY", "ffmpeg"))
+AUDIO_PREPROCESS_WORKERS = int(os.getenv("AUDIO_PREPROCESS_WORKERS", "2"))
+AUDIO_PREPROCESS_TIMEOUT = float(os.getenv("AUDIO_PREPROCESS_TIMEOUT", "15"))
+AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "16k")
+TARGET_RATE = 16000
+
+# Energy VAD
+VAD_FRAME_MS = 30
+VAD_MARGIN_DB = 10.0    # speech is this far above the noise floor (10th percentile frame)
+VAD_PEAK_RANGE_DB = 30.0  # ...or within this range of the loudest frame, whichever is lower
+VAD_MIN_DB = -60.0
+VAD_PAD_MS = 210        # kept around speech so word edges are not clipped
+VAD_MAX_GAP_MS = 600    # longer internal pauses are shortened to this
+
+def trim_silence(samples, rate: int = TARGET_RATE):
+    """Drop leading/trailing silence and shorten long pauses in mono int16 samples."""
+    frame = rate * VAD_FRAME_MS // 1000
+    n = len(samples) // frame
+    if n == 0:
+        return samples
+    frames = samples[:n * frame].reshape(n, frame).astype(np.float32) / 32768.0
+    db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    threshold = max(VAD_MIN_DB, min(np.percentile(db, 10) + VAD_MARGIN_DB, db.max() - VAD_PEAK_RANGE_DB))
+    voiced = db > threshold
+    if not voiced.any():
+        return samples  # let STT decide
+
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    keep = np.convolve(voiced, np.ones(2 * pad + 1), mode="same") > 0
+    first, last = np.flatnonzero(keep)[[0, -1]]
+    keep[:first] = False
+    keep[last + 1:] = False
+
+    # Internal pauses: keep half of the allowed gap at each end of a long silent run
+    max_gap = VAD_MAX_GAP_MS // VAD_FRAME_MS
+    edges = np.flatnonzero(np.diff(keep[first:last + 1].astype(np.int8))) + first + 1
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start > max_gap:
+            keep[start + max_gap // 2:end - max_gap // 2] = False
+    return samples[:n * frame].reshape(n, frame)[keep].reshape(-1)
+
+def _ffmpeg(args: list[str], data: bytes) -> bytes:
+    result = subprocess.run(
+        [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", *args],
+        input=data, capture_output=True, check=True, timeout=AUDIO_PREPROCESS_TIMEOUT,
+    )
+    return result.stdout
+
+def normalize_audio(data: bytes) -> tuple[bytes, float, float]:
+    """
+    Decode any browser container to mono 16 kHz, trim silence and re-encode as
+    low-bitrate Opus (Ogg). Runs in a worker process. Returns
+    (encoded bytes, seconds before trimming, seconds after).
+    """
+    pcm = _ffmpeg(["-i", "pipe:0", "-ac", "1", "-ar", str(TARGET_RATE), "-f", "s16le", "pipe:1"], data)
+    seconds_in = len(pcm) / 2 / TARGET_RATE
+    if np is not None:
+        pcm = trim_silence(np.frombuffer(pcm, dtype=np.int16)).tobytes()
+    encoded = _ffmpeg([
+        "-f", "s16le", "-ar", str(TARGET_RATE), "-ac", "1", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1",
+    ], pcm)
+    return encoded, seconds_in, len(pcm) / 2 / TARGET_RATE
+
+class AudioPreprocessor:
+    """
+    Normalizes uploads before STT in a process pool, so decoding and encoding
+    never compete with the event loop for the GIL. Falls back to the original
+    bytes whenever the stage is unavailable, fails or does not make them smaller.
+    """
+
+    def __init__(self, workers: int = AUDIO_PREPROCESS_WORKERS):
+        self.workers = workers
+        self.enabled = AUDIO_PREPROCESS != "0" and FFMPEG_PATH is not None
+        self._executor: ProcessPoolExecutor | None = None
+        self.stats = {
+            "runs": 0, "failures": 0, "bytes_in": 0, "bytes_out": 0,
+            "audio_seconds_in": 0.0, "audio_seconds_out": 0.0, "total_time": 0.0,
+        }
+
+    async def normalize(self, data: bytes) -> tuple[bytes, float | None]:
+        """Return (bytes to upload, audio seconds or None if unknown)."""
+        if not self.enabled or not data:
+            return data, None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        started = time.perf_counter()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, normalize_audio, data)
+            encoded, seconds_in, seconds_out = await asyncio.wait_for(future, AUDIO_PREPROCESS_TIMEOUT)
+        except Exception as e:
+            self.stats["failures"] += 1
+            print("Warning: audio preprocessing failed:", e)
+            return data, None
+        finally:
+            self.stats["total_time"] += time.perf_counter() - started
+
+        self.stats["runs"] += 1
+        self.stats["audio_seconds_in"] += seconds_in
+        self.stats["audio_seconds_out"] += seconds_out
+        if not encoded or len(encoded) >= len(data):
+            encoded = data
+        self.stats["bytes_in"] += len(data)
+        self.stats["bytes_out"] += len(encoded)
+        return encoded, seconds_out
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def snapshot(self) -> dict:
+        runs = self.stats["runs"] + self.stats["failures"]
+        return {
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in self.stats.items()},
+            "enabled": self.enabled,
+            "trim_silence": np is not None,
+            "bytes_saved": self.stats["bytes_in"] - self.stats["bytes_out"],
+            "avg_time": round(self.stats["total_time"] / runs, 3) if runs else None,
+        }
+
+audio_preprocessor = AudioPreprocessor()
@@ -0,0 +1,96 @@
+import os
+from pathlib import Path, PurePosixPath
+from typing import Callable
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+def immutable(max_age: int = IMMUTABLE_MAX_AGE, private: bool = False) -> str:
+    return f"{'private' if private else 'public'}, max-age={max_age}, immutable"
+
+class AudioStaticFiles(StaticFiles):
+    """
+    StaticFiles for generated audio. Files whose relative path matches one of
+    cache_rules (glob -> Cache-Control) never change, so they get that header.
+    etag_for(path) may supply a hash of the file's bytes as a strong ETag;
+    otherwise Starlette's stat-based ETag is kept. Conditional GETs (304) and
+    Range requests (206) are handled by StaticFiles and FileResponse as usual.
+    """
+
+    def __init__(self, *args, cache_rules: list[tuple[str, str]] = (),
+                 etag_for: Callable[[Path], str | None] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_rules = list(cache_rules)
+        self.etag_for = etag_for
+
+    def file_response(self, full_path: os.PathLike, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        path = Path(full_path)
+        try:
+            relative = PurePosixPath(path.relative_to(self.directory).as_posix())
+        except ValueError:
+            relative = PurePosixPath(path.name)
+        for pattern, cache_control in self.cache_rules:
+            if relative.match(pattern):
+                response.headers["Cache-Control"] = cache_control
+                break
+        etag = self.etag_for(path) if self.etag_for else None
+        if etag:
+            response.headers["ETag"] = f'"{etag}"'
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+def parse_byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    (start, end) inclusive for a single "bytes=" range, or None when the
+    header should be ignored (malformed or multiple ranges). Raises
+    ValueError when the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, sep, end_s = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_s:
+            start = int(start_s)
+            end = min(int(end_s), size - 1) if end_s else size - 1
+        else:
+            start, end = max(size - int(end_s), 0), size - 1  # suffix range: last N bytes
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise ValueError(f"unsatisfiable range {header!r}")
+    return start, end
+
+def bytes_response(request: Request, data: bytes, etag: str, media_type: str = "audio/mpeg",
+                   cache_control: str | None = None) -> Response:
+    """Serve in-memory audio with a strong ETag, 304 on a match and single-range 206 support."""
+    headers = {"ETag": f'"{etag}"', "Accept-Ranges": "bytes"}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or headers["ETag"] in
+                          [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == headers["ETag"]):
+        try:
+            span = parse_byte_range(range_header, len(data))
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(data)}"})
+        if span is not None:
+            start, end = span
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return Response(data[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+    return Response(data, media_type=media_type, headers=headers)
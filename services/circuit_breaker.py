@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from services.deadline import DeadlineExceeded
+from services.provider_limits import is_overload
+
+T = TypeVar("T")
+
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "30"))          # seconds of outcomes considered
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))        # no verdict on fewer calls
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "15"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class ProviderError(Exception):
+    """The provider itself failed a call (429/5xx reply or no usable answer in time)."""
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+def is_provider_failure(status: int | None = None, error: BaseException | None = None) -> bool:
+    """
+    Whether an outcome counts against the provider: 429/5xx, timeouts and
+    transport errors do; a 4xx reply is the request's own fault.
+    """
+    if error is not None:
+        status = getattr(error, "code", None) or getattr(error, "status", None)
+        if not isinstance(status, int):
+            return True
+    return is_overload(status)
+
+class CircuitBreaker:
+    """
+    Per-provider breaker. Closed: calls pass and outcomes are recorded over a
+    rolling window; provider failures (see is_provider_failure) and calls
+    slower than slow_call count as bad, client errors such as a rejected
+    voice id or undecodable audio do not.
+    When the bad share reaches failure_rate the breaker opens and every call
+    is refused at once, so callers go straight to their fallback. After
+    open_seconds one probe call is let through (half-open): success closes
+    the breaker, failure opens it again.
+    """
+
+    def __init__(self, name: str, slow_call: float, window: float = BREAKER_WINDOW,
+                 min_calls: int = BREAKER_MIN_CALLS, failure_rate: float = BREAKER_FAILURE_RATE,
+                 open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.slow_call = slow_call
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes: deque[tuple[float, bool]] = deque()  # (time, bad)
+        self._probing = False
+        self.stats = {"calls": 0, "failures": 0, "slow": 0, "short_circuited": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        """True if a call may go to the provider now (claims the probe when half-open)."""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.stats["short_circuited"] += 1
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.stats["short_circuited"] += 1
+                return False
+            self._probing = True
+        return True
+
+    def record(self, ok: bool, latency: float):
+        now = time.monotonic()
+        slow = latency > self.slow_call
+        bad = not ok or slow
+        self.stats["calls"] += 1
+        self.stats["failures"] += not ok
+        self.stats["slow"] += ok and slow
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if bad:
+                self._open(now)
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append((now, bad))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+        if len(self._outcomes) >= self.min_calls:
+            bad_share = sum(b for _, b in self._outcomes) / len(self._outcomes)
+            if bad_share >= self.failure_rate:
+                self._open(now)
+
+    def abandon(self):
+        """The allowed call never completed (cancelled or out of budget); frees the half-open probe."""
+        self._probing = False
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self._outcomes.clear()
+        self.stats["opened"] += 1
+        print(f"Warning: circuit breaker for {self.name} opened")
+
+    async def call(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T | None:
+        """
+        Run fn through the breaker; returns None without calling fn while open.
+        fn raises for provider failures; anything it returns (None included,
+        e.g. after a 4xx) is a healthy call as far as the provider goes.
+        """
+        if not self.allow():
+            return None
+        started = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            self.abandon()  # our own cancel or budget: no verdict on the provider
+            raise
+        except Exception as e:
+            self.record(not is_provider_failure(error=e), time.monotonic() - started)
+            raise
+        self.record(True, time.monotonic() - started)
+        return result
+
+    def snapshot(self) -> dict:
+        retry_in = self.open_seconds - (time.monotonic() - self.opened_at) if self.state == OPEN else None
+        return {
+            **self.stats,
+            "state": self.state,
+            "retry_in": round(max(retry_in, 0), 1) if retry_in is not None else None,
+            "window_calls": len(self._outcomes),
+        }
+
+assemblyai_breaker = CircuitBreaker("assemblyai", slow_call=float(os.getenv("ASSEMBLYAI_SLOW_CALL", "30")))
+murf_breaker = CircuitBreaker("murf", slow_call=float(os.getenv("MURF_SLOW_CALL", "15")))
+gemini_breaker = CircuitBreaker("gemini", slow_call=float(os.getenv("GEMINI_SLOW_CALL", "20")))
+
+def get_breakers() -> dict:
+    return {breaker.name: breaker.snapshot() for breaker in (assemblyai_breaker, murf_breaker, gemini_breaker)}
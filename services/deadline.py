@@ -0,0 +1,73 @@
+import os
+import math
+import time
+import asyncio
+from typing import Coroutine, TypeVar
+
+T = TypeVar("T")
+
+# End-to-end budget for one voice turn, from request entry to the reply (seconds)
+TURN_DEADLINE = float(os.getenv("TURN_DEADLINE", "25"))
+# Held back from earlier stages so later ones still get a chance to run
+TURN_LLM_RESERVE = float(os.getenv("TURN_LLM_RESERVE", "6"))
+TURN_TTS_RESERVE = float(os.getenv("TURN_TTS_RESERVE", "4"))
+
+class DeadlineExceeded(Exception):
+    """The turn's budget ran out; says nothing about the provider's health."""
+
+class Deadline:
+    """
+    Absolute end time of one turn, passed explicitly to every stage. Stages
+    cap their own timeouts, polls and queue waits with cap() and wait(), which
+    raise DeadlineExceeded once it has passed, so the turn can degrade instead
+    of overrunning. reserve() hands an earlier stage a deadline that leaves time
+    for the stages after it.
+    """
+
+    def __init__(self, expires_at: float = math.inf):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cap(self, timeout: float | None = None) -> float | None:
+        """
+        timeout limited to the time left (None only when both are unbounded).
+        Never 0: aiohttp reads a zero timeout as "no timeout", so an expired
+        deadline raises DeadlineExceeded instead.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded()
+        if timeout is None:
+            return None if remaining == math.inf else remaining
+        return min(timeout, remaining)
+
+    async def wait(self, coro: Coroutine[object, object, T]) -> T:
+        """Await coro within the time left; DeadlineExceeded if it runs out first."""
+        try:
+            timeout = self.cap()
+        except DeadlineExceeded:
+            coro.close()
+            raise
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded() from None
+
+    def check(self):
+        if self.expired:
+            raise DeadlineExceeded()
+
+    def reserve(self, seconds: float) -> "Deadline":
+        return Deadline(self.expires_at - seconds)
+
+NO_DEADLINE = Deadline()
@@ -0,0 +1,125 @@
+import os
+import json
+import asyncio
+import hashlib
+from pathlib import Path
+
+from services.tts_service import generate_murf_audio, download_url_to_file, STATIC_DIR
+
+# Pre-built clips: manifest.json maps clip name -> {"file": ..., "text": ...} (see tools/build_fallback_bundle.py)
+FALLBACK_BUNDLE_DIR = Path(os.getenv("FALLBACK_BUNDLE_DIR", str(STATIC_DIR / "fallback")))
+FALLBACK_AUDIO_FILE = STATIC_DIR / "fallback_audio.mp3"
+FALLBACK_VOICE_ID = os.getenv("FALLBACK_VOICE_ID", "en-IN-aarav")
+FALLBACK_RETRY_INTERVAL = float(os.getenv("FALLBACK_RETRY_INTERVAL", "60"))
+FALLBACK_MAX_ATTEMPTS = int(os.getenv("FALLBACK_MAX_ATTEMPTS", "5"))
+
+FALLBACK_CLIPS = {
+    "default": "I'm having trouble connecting right now. Please try again later.",
+    "stt_failed": "Sorry, I didn't catch that. Could you say it again?",
+}
+
+class FallbackAudio:
+    """
+    In-memory fallback clips. Startup only schedules the warm-up task: it
+    loads the pre-built bundle (and the legacy fallback_audio.mp3) from disk,
+    and synthesizes the default clip through Murf only if neither has it,
+    retrying in the background while Murf is unreachable.
+    """
+
+    def __init__(self, bundle_dir: Path = FALLBACK_BUNDLE_DIR, legacy_file: Path = FALLBACK_AUDIO_FILE,
+                 voice_id: str = FALLBACK_VOICE_ID):
+        self.bundle_dir = bundle_dir
+        self.legacy_file = legacy_file
+        self.voice_id = voice_id
+        self.clips: dict[str, bytes] = {}
+        self.etags: dict[str, str] = {}  # sha256 of each clip; also versions its URL
+        self.state = "pending"  # pending -> warming -> ready | degraded
+        self.attempts = 0
+        self._task: asyncio.Task | None = None
+
+    def _load_from_disk(self) -> dict[str, bytes]:
+        clips = {}
+        manifest_path = self.bundle_dir / "manifest.json"
+        if manifest_path.exists():
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                for name, entry in manifest.get("clips", {}).items():
+                    clips[name] = (self.bundle_dir / entry["file"]).read_bytes()
+            except (OSError, ValueError, KeyError) as e:
+                print("Warning: Could not load fallback bundle:", e)
+        if "default" not in clips and self.legacy_file.exists():
+            clips["default"] = self.legacy_file.read_bytes()
+        return clips
+
+    async def _synthesize_default(self) -> bytes | None:
+        audio_url = await generate_murf_audio(FALLBACK_CLIPS["default"], voice_id=self.voice_id)
+        if not audio_url:
+            return None
+        if audio_url.startswith("/static/"):
+            data = await asyncio.to_thread((STATIC_DIR / audio_url[len("/static/"):]).read_bytes)
+            await asyncio.to_thread(self.legacy_file.write_bytes, data)
+            return data
+        if await download_url_to_file(audio_url, self.legacy_file):
+            return await asyncio.to_thread(self.legacy_file.read_bytes)
+        return None
+
+    async def warm_up(self):
+        self.state = "warming"
+        self._store(await asyncio.to_thread(self._load_from_disk))
+        # Readiness never waits on Murf: without a bundle the worker serves text-only fallbacks meanwhile
+        self.state = "ready" if "default" in self.clips else "degraded"
+        while "default" not in self.clips and self.attempts < FALLBACK_MAX_ATTEMPTS:
+            if self.attempts:
+                await asyncio.sleep(FALLBACK_RETRY_INTERVAL)
+            self.attempts += 1
+            try:
+                data = await self._synthesize_default()
+            except OSError as e:
+                print("Warning: Could not save fallback audio:", e)
+                data = None
+            if data:
+                self._store({"default": data})
+        self.state = "ready" if "default" in self.clips else "degraded"
+
+    def _store(self, clips: dict[str, bytes]):
+        for name, data in clips.items():
+            self.clips[name] = data
+            self.etags[name] = hashlib.sha256(data).hexdigest()
+
+    def start(self):
+        """Schedule the warm-up (call from FastAPI startup); returns immediately."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.warm_up())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ("ready", "degraded")
+
+    def resolve(self, name: str) -> str | None:
+        """name if that clip exists, else "default" if it exists, else None."""
+        if name in self.clips:
+            return name
+        return "default" if "default" in self.clips else None
+
+    def get(self, name: str = "default") -> bytes | None:
+        name = self.resolve(name)
+        return self.clips[name] if name else None
+
+    def url(self, name: str = "default") -> str | None:
+        """Versioned URL of the clip (or the default clip), or None while none is available."""
+        name = self.resolve(name)
+        if name is None:
+            return None
+        return f"/audio/fallback/{name}?v={self.etags[name][:16]}"
+
+    def status(self) -> dict:
+        return {"state": self.state, "clips": sorted(self.clips), "attempts": self.attempts}
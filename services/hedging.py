@@ -0,0 +1,116 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Hedge when the first attempt is slower than this percentile of recent attempts
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+# Extra attempts allowed per request (0.05 = at most ~5% more load on the provider)
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = 200       # recent latencies the percentile is taken over
+HEDGE_MAX_BURST = 5.0    # unspent budget that may accumulate, in hedges
+
+class Hedger:
+    """
+    Hedged requests for one provider. The first attempt runs alone; if it
+    has not answered after the chosen percentile of recent latency, a second
+    attempt is started and whichever returns a usable result first wins and
+    the other is cancelled. Each request earns `budget` hedges and each hedge
+    spends one, so the extra load stays at that share even when the provider
+    is slow for everyone. Disabled hedgers just run the attempt.
+    """
+
+    def __init__(self, name: str, enabled: bool, percentile: float = HEDGE_PERCENTILE,
+                 budget: float = HEDGE_BUDGET, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=HEDGE_WINDOW)
+        self._tokens = 0.0
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "over_budget": 0}
+
+    def hedge_delay(self) -> float | None:
+        """Percentile of recent attempt latency, or None until there are enough samples."""
+        if len(self._latencies) < max(self.min_samples, 1):
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(int(len(ordered) * self.percentile / 100), len(ordered) - 1)]
+
+    async def _timed(self, attempt: Callable[[], Awaitable[T]], ok: Callable[[T], bool]) -> T:
+        started = time.monotonic()
+        result = await attempt()
+        if ok(result):
+            self._latencies.append(time.monotonic() - started)
+        return result
+
+    async def run(self, attempt: Callable[[], Awaitable[T]],
+                  ok: Callable[[T], bool] = lambda result: result is not None) -> T:
+        """Run attempt(), hedged with a second call when the first is slow; returns the winner's result."""
+        self.stats["requests"] += 1
+        self._tokens = min(HEDGE_MAX_BURST, self._tokens + self.budget)
+        delay = self.hedge_delay() if self.enabled else None
+        first = asyncio.create_task(self._timed(attempt, ok))
+        tasks = {first}
+        try:
+            if delay is None:
+                return await first
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return first.result()
+            if self._tokens < 1:
+                self.stats["over_budget"] += 1
+                return await first
+            self._tokens -= 1
+            self.stats["hedged"] += 1
+            tasks.add(asyncio.create_task(self._timed(attempt, ok)))
+
+            result, error = None, None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    result = task.result()
+                    if ok(result):
+                        self.stats["hedge_wins"] += task is not first
+                        return result
+            # Neither attempt produced a usable result: report it like a single failed call
+            if error is not None and result is None:
+                raise error
+            return result
+        finally:
+            for task in tasks:
+                task.cancel()  # the loser, or both when our caller was cancelled
+
+    def snapshot(self) -> dict:
+        delay = self.hedge_delay()
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "budget": self.budget,
+            "hedge_delay": round(delay, 3) if delay is not None else None,
+            "tokens": round(self._tokens, 2),
+        }
+
+def _hedger_from_env(name: str) -> Hedger:
+    prefix = name.upper()
+    return Hedger(
+        name,
+        enabled=os.getenv(f"{prefix}_HEDGE_ENABLED", "0") == "1",
+        percentile=float(os.getenv(f"{prefix}_HEDGE_PERCENTILE", str(HEDGE_PERCENTILE))),
+        budget=float(os.getenv(f"{prefix}_HEDGE_BUDGET", str(HEDGE_BUDGET))),
+    )
+
+murf_hedger = _hedger_from_env("murf")
+gemini_hedger = _hedger_from_env("gemini")
+
+def get_hedgers() -> dict:
+    return {hedger.name: hedger.snapshot() for hedger in (murf_hedger, gemini_hedger)}
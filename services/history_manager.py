@@ -0,0 +1,119 @@
+import os
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+# Fold older messages into the summary once at least this many are left out of the window
+SUMMARY_REFRESH_MIN_MESSAGES = int(os.getenv("SUMMARY_REFRESH_MIN_MESSAGES", "2"))
+SUMMARY_CACHE_SESSIONS = 1024
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)."""
+    return max(1, len(text) // 4)
+
+@dataclass
+class SessionSummary:
+    text: str
+    covered: int  # number of leading messages folded into text
+
+class HistoryManager:
+    """
+    Keeps the prompt history within a token budget: the last few turns are
+    sent verbatim and everything older is represented by a rolling summary.
+    The verbatim window grows append-only until it hits the budget or
+    keep_turns, then is trimmed to half, so the prompt prefix stays stable
+    between trims. The summary is refreshed by a background task, so a turn
+    never waits on it; until it covers the trimmed messages they stay in the
+    prompt verbatim (up to twice the budget, in case the summarizer keeps failing).
+    """
+
+    def __init__(self, summarize: Callable[[str], Awaitable[str | None]],
+                 token_budget: int = HISTORY_TOKEN_BUDGET, keep_turns: int = HISTORY_KEEP_TURNS):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.keep_messages = keep_turns * 2
+        self._summaries: OrderedDict[str, SessionSummary] = OrderedDict()
+        self._starts: OrderedDict[str, int] = OrderedDict()  # first verbatim message per session
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self.stats = {"refreshes": 0, "refresh_failures": 0}
+
+    def window(self, session_id: str, messages: list[dict]) -> tuple[str | None, list[dict]]:
+        """
+        Return (summary text or None, recent messages) for the next prompt and
+        schedule a summary refresh if messages have fallen out of the window.
+        """
+        summary = self._summaries.get(session_id)
+        covered = summary.covered if summary and summary.covered <= len(messages) else 0
+        if covered:
+            self._summaries.move_to_end(session_id)
+
+        budget = self.token_budget - (estimate_tokens(summary.text) if covered else 0)
+        start = self._starts.get(session_id, 0)
+        if start > len(messages):
+            start = 0
+        start = max(start, covered)
+        recent = messages[start:]
+        if len(recent) > self.keep_messages or sum(estimate_tokens(m["content"]) for m in recent) > budget:
+            # Trim down to half the limits, so the verbatim window then only grows for a few
+            # turns and the prompt prefix stays stable (and cacheable) between trims.
+            recent = []
+            used = 0
+            for msg in reversed(messages[start:]):
+                cost = estimate_tokens(msg["content"])
+                if recent and (len(recent) >= max(1, self.keep_messages // 2) or used + cost > budget // 2):
+                    break
+                recent.append(msg)
+                used += cost
+            recent.reverse()
+            if len(recent) > 1 and recent[0]["role"] == "assistant":
+                recent = recent[1:]  # start the window on a user turn
+        self._starts[session_id] = len(messages) - len(recent)
+        self._starts.move_to_end(session_id)
+        while len(self._starts) > SUMMARY_CACHE_SESSIONS:
+            self._starts.popitem(last=False)
+
+        fold_end = len(messages) - len(recent)
+        if fold_end - covered >= SUMMARY_REFRESH_MIN_MESSAGES:
+            self._schedule_refresh(session_id, messages[:fold_end], summary if covered else None)
+
+        # Trimmed messages no summary covers yet are still sent, or the next turn would lose them
+        pending = messages[covered:fold_end]
+        used = sum(estimate_tokens(m["content"]) for m in pending + recent)
+        while pending and used > 2 * budget:
+            used -= estimate_tokens(pending.pop(0)["content"])
+        return (summary.text if covered else None), pending + recent
+
+    def _schedule_refresh(self, session_id: str, older: list[dict], summary: SessionSummary | None):
+        if session_id in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(session_id, older, summary))
+        self._refreshing[session_id] = task
+        task.add_done_callback(lambda _t: self._refreshing.pop(session_id, None))
+
+    async def _refresh(self, session_id: str, older: list[dict], summary: SessionSummary | None):
+        start = summary.covered if summary else 0
+        new_lines = "\n".join(f"{msg['role'].capitalize()}: {msg['content']}" for msg in older[start:])
+        prompt = (
+            "Update the running summary of a conversation between a user and a voice assistant.\n"
+            "Keep names, facts, preferences and open questions; drop small talk. "
+            "Reply with the summary only, in at most 120 words.\n\n"
+            f"Current summary:\n{summary.text if summary else '(none)'}\n\n"
+            f"New messages:\n{new_lines}"
+        )
+        text = await self.summarize(prompt)
+        if not text:
+            self.stats["refresh_failures"] += 1
+            return
+        current = self._summaries.get(session_id)
+        if current is None or current.covered < len(older):
+            self._summaries[session_id] = SessionSummary(text.strip(), len(older))
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > SUMMARY_CACHE_SESSIONS:
+                self._summaries.popitem(last=False)
+        self.stats["refreshes"] += 1
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "summaries": len(self._summaries), "refreshing": len(self._refreshing)}
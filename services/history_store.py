@@ -0,0 +1,162 @@
+import os
+import time
+import queue
+import sqlite3
+import asyncio
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+HISTORY_DB_PATH = Path(__file__).resolve().parent.parent / "chat_history.db"
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "64"))
+HISTORY_BATCH_WINDOW = float(os.getenv("HISTORY_BATCH_WINDOW", "0.05"))
+HISTORY_CACHE_SESSIONS = int(os.getenv("HISTORY_CACHE_SESSIONS", "256"))
+# Cached sessions are re-read after this long so writes from other workers show up
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "30"))
+
+_STOP = object()
+
+class ChatHistoryRepository:
+    """
+    Chat history persisted in chat_history.db (WAL mode). Appends are queued
+    and group-committed by a background writer thread; reads go through an
+    in-memory LRU of recent sessions and only hit SQLite, off the event loop,
+    on a miss.
+    """
+
+    def __init__(self, db_path: Path = HISTORY_DB_PATH, batch_size: int = HISTORY_BATCH_SIZE,
+                 batch_window: float = HISTORY_BATCH_WINDOW, cache_sessions: int = HISTORY_CACHE_SESSIONS,
+                 cache_ttl: float = HISTORY_CACHE_TTL):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.cache_sessions = cache_sessions
+        self.cache_ttl = cache_ttl
+        self._cache: OrderedDict[str, tuple[float, list[dict]]] = OrderedDict()
+        self._loading: dict[str, bool] = {}  # session -> appended to while its load was in flight
+        self._queue: queue.Queue = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._writer: threading.Thread | None = None
+        self._local = threading.local()
+        self.stats = {"cache_hits": 0, "cache_misses": 0, "batches": 0, "rows_written": 0, "write_errors": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _read_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def start(self):
+        """Create the schema and start the writer thread (call from FastAPI startup)."""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_history ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, role TEXT, content TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_session ON chat_history(session_id, id)")
+            conn.commit()
+        finally:
+            conn.close()
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._writer_loop, name="history-writer", daemon=True)
+            self._writer.start()
+
+    def stop(self):
+        """Flush queued writes and stop the writer thread (blocking)."""
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+
+    def _writer_loop(self):
+        conn = self._connect()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            rows = [item for item in batch if isinstance(item, tuple)]
+            if rows:
+                try:
+                    conn.executemany("INSERT INTO chat_history (session_id, role, content) VALUES (?, ?, ?)", rows)
+                    conn.commit()
+                    self.stats["batches"] += 1
+                    self.stats["rows_written"] += len(rows)
+                except sqlite3.Error as e:
+                    self.stats["write_errors"] += 1
+                    print("History write failed:", e)
+                with self._pending_lock:
+                    self._pending -= len(rows)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()  # flush marker: everything queued before it is committed
+                elif item is _STOP:
+                    running = False
+        conn.close()
+
+    async def flush(self):
+        """Wait until every write queued so far has been committed."""
+        if self._writer is None:
+            return
+        marker = threading.Event()
+        self._queue.put(marker)
+        await asyncio.to_thread(marker.wait)
+
+    async def append(self, session_id: str, role: str, content: str):
+        """Record a message; returns immediately, the row is committed by the writer thread."""
+        cached = self._cache.get(session_id)
+        if cached is not None:
+            cached[1].append({"role": role, "content": content})
+        if session_id in self._loading:
+            self._loading[session_id] = True
+        with self._pending_lock:
+            self._pending += 1
+        self._queue.put((session_id, role, content))
+
+    def _load(self, session_id: str) -> list[dict]:
+        rows = self._read_conn().execute(
+            "SELECT role, content FROM chat_history WHERE session_id = ? ORDER BY id", (session_id,)
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    async def get(self, session_id: str) -> list[dict]:
+        """Return the session's messages, oldest first."""
+        cached = self._cache.get(session_id)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            self._cache.move_to_end(session_id)
+            self.stats["cache_hits"] += 1
+            return list(cached[1])
+
+        self.stats["cache_misses"] += 1
+        if self._pending:
+            await self.flush()  # read-your-writes for appends not committed yet
+        self._loading[session_id] = False
+        try:
+            messages = await asyncio.to_thread(self._load, session_id)
+        finally:
+            raced = self._loading.pop(session_id, True)
+        if not raced:
+            self._cache[session_id] = (time.monotonic(), messages)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_sessions:
+                self._cache.popitem(last=False)
+        return list(messages)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "pending_writes": self._pending, "cached_sessions": len(self._cache)}
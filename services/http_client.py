@@ -0,0 +1,55 @@
+import os
+import aiohttp
+
+# One pooled session for every provider call: connections, DNS lookups and TLS
+# sessions are reused across STT, TTS and downloads instead of per request.
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "120"))
+
+_session: aiohttp.ClientSession | None = None
+
+def _build_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        use_dns_cache=True,
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+def request_timeout(total: float) -> aiohttp.ClientTimeout:
+    """
+    Per-request timeout. A bare number passed as timeout= replaces the session
+    timeout entirely, so the connect limit would be lost; this keeps it.
+    """
+    return aiohttp.ClientTimeout(total=total, sock_connect=HTTP_CONNECT_TIMEOUT)
+
+async def init_http_session() -> aiohttp.ClientSession:
+    """Create the application-wide session (call from FastAPI startup)."""
+    global _session
+    if _session is None or _session.closed:
+        _session = _build_session()
+    return _session
+
+async def close_http_session():
+    """Close the application-wide session (call from FastAPI shutdown)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Return the shared session. Created lazily if startup has not run yet
+    (e.g. when a service is used from a script).
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _build_session()
+    return _session
@@ -0,0 +1,18 @@
+class EWMA:
+    """Exponentially weighted moving average of a latency in seconds."""
+
+    def __init__(self, alpha: float = 0.2, initial: float | None = None):
+        self.alpha = alpha
+        self.value = initial
+        self.samples = 0
+
+    def update(self, sample: float) -> float:
+        self.value = sample if self.value is None else self.alpha * sample + (1 - self.alpha) * self.value
+        self.samples += 1
+        return self.value
+
+    def get(self, default: float = 0.0) -> float:
+        return default if self.value is None else self.value
+
+    def snapshot(self) -> dict:
+        return {"ewma": round(self.value, 3) if self.value is not None else None, "samples": self.samples}
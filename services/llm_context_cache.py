@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from services.history_manager import estimate_tokens
+
+CONTEXT_CACHE_ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "1") == "1"
+# Gemini refuses explicit caches below its per-model minimum (1024 tokens for 2.5 Flash)
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+CONTEXT_CACHE_TTL = int(os.getenv("CONTEXT_CACHE_TTL", "600"))
+CONTEXT_CACHE_SESSIONS = int(os.getenv("CONTEXT_CACHE_SESSIONS", "256"))
+# Entries this close to expiry are treated as gone, so a request never races the provider's TTL
+_EXPIRY_MARGIN = 10
+
+@dataclass
+class CachedPrefix:
+    name: str
+    fingerprint: str
+    n_messages: int
+    tokens: int
+    expires_at: float
+
+def prefix_fingerprint(system_instruction: str | None, messages: list[dict]) -> str:
+    payload = json.dumps([system_instruction, [(m["role"], m["content"]) for m in messages]])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ContextCacheManager:
+    """
+    Per-session explicit context caches for Gemini. The stable part of a
+    conversation (system instruction + all but the newest message) is cached
+    once it is long enough; later turns that extend the same prefix send only
+    the new messages and reference the cache. Creation and deletion run in the
+    background, off the request path.
+    """
+
+    def __init__(self, create: Callable[[str | None, list[dict], int], Awaitable[str]],
+                 delete: Callable[[str], Awaitable[None]], min_tokens: int = CONTEXT_CACHE_MIN_TOKENS,
+                 ttl: int = CONTEXT_CACHE_TTL, max_sessions: int = CONTEXT_CACHE_SESSIONS):
+        self.create = create
+        self.delete = delete
+        self.min_tokens = min_tokens
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._entries: OrderedDict[str, CachedPrefix] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._deletes: set[asyncio.Task] = set()
+        self.stats = {"hits": 0, "misses": 0, "created": 0, "create_failures": 0, "deleted": 0}
+
+    def _valid(self, session_id: str, system_instruction: str | None, messages: list[dict]) -> CachedPrefix | None:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        if time.time() > entry.expires_at - _EXPIRY_MARGIN:
+            self._drop(session_id)
+            return None
+        if entry.n_messages >= len(messages):
+            return None
+        if entry.fingerprint != prefix_fingerprint(system_instruction, messages[:entry.n_messages]):
+            # The history was trimmed or the summary changed: this cache can never match again
+            self._drop(session_id)
+            return None
+        return entry
+
+    def lookup(self, session_id: str, system_instruction: str | None, messages: list[dict]) -> tuple[str | None, list[dict]]:
+        """Return (cache name, messages still to send), or (None, messages) when no cache applies."""
+        entry = self._valid(session_id, system_instruction, messages)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None, messages
+        self._entries.move_to_end(session_id)
+        self.stats["hits"] += 1
+        return entry.name, messages[entry.n_messages:]
+
+    def refresh(self, session_id: str, system_instruction: str | None, messages: list[dict]):
+        """Cache this turn's stable prefix in the background if it is worth it."""
+        prefix = messages[:-1]
+        if not prefix or session_id in self._tasks:
+            return
+        tokens = estimate_tokens(system_instruction or "") + sum(estimate_tokens(m["content"]) for m in prefix)
+        if tokens < self.min_tokens:
+            return
+        entry = self._valid(session_id, system_instruction, messages)
+        # Keep the current cache while the uncached tail is still small
+        if entry is not None and tokens - entry.tokens < self.min_tokens // 2:
+            return
+        task = asyncio.create_task(self._create(session_id, system_instruction, prefix, tokens))
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda _t: self._tasks.pop(session_id, None))
+
+    async def _create(self, session_id: str, system_instruction: str | None, prefix: list[dict], tokens: int):
+        try:
+            name = await self.create(system_instruction, prefix, self.ttl)
+        except Exception as e:
+            self.stats["create_failures"] += 1
+            print("Gemini context cache create failed:", e)
+            return
+        self._drop(session_id)
+        self._entries[session_id] = CachedPrefix(
+            name, prefix_fingerprint(system_instruction, prefix), len(prefix), tokens, time.time() + self.ttl
+        )
+        self.stats["created"] += 1
+        while len(self._entries) > self.max_sessions:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        self.stats["deleted"] += 1
+
+        async def delete():
+            try:
+                await self.delete(entry.name)
+            except Exception as e:
+                print("Gemini context cache delete failed:", e)
+
+        # Expired caches are already gone server-side; others are deleted eagerly to stop storage billing
+        if time.time() < entry.expires_at:
+            task = asyncio.create_task(delete())
+            self._deletes.add(task)
+            task.add_done_callback(self._deletes.discard)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "sessions": len(self._entries), "creating": len(self._tasks)}
@@ -1,4 +1,14 @@
 import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.llm_context_cache import ContextCacheManager, CONTEXT_CACHE_ENABLED
+from services.provider_limits import gemini_limiter
+from services.circuit_breaker import gemini_breaker, ProviderError, is_provider_failure
+from services.hedging import gemini_hedger
+from services.deadline import Deadline, DeadlineExceeded, NO_DEADLINE
 
 try:
     from google import genai
@@ -6,10 +16,15 @@ except Exception:
     genai = None
 
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# Gemini calls run on their own bounded pool so a slow reply never blocks the event loop
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
 
 if genai and GEMINI_KEY:
     try:
-        client = genai.Client(api_key=GEMINI_KEY)
+        client = genai.Client(api_key=GEMINI_KEY, http_options={"timeout": int(LLM_TIMEOUT * 1000)})
     except Exception as e:
         print("Warning: Could not initialize Gemini client:", e)
         client = None
@@ -20,15 +35,261 @@ else:
     if not GEMINI_KEY:
         print("Warning: GEMINI_API_KEY not set.")
 
-def query_gemini(prompt: str) -> str | None:
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+_llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_llm_stats = {
+    "waiting": 0,
+    "max_waiting": 0,
+    "in_flight": 0,
+    "completed": 0,
+    "failed": 0,
+    "timeouts": 0,
+    "total_latency": 0.0,
+}
+
+def to_contents(messages: list[dict]) -> list[dict]:
+    """Chat messages ({"role": "user"|"assistant", "content"}) as Gemini contents."""
+    return [
+        {"role": "model" if msg["role"] == "assistant" else "user", "parts": [{"text": msg["content"]}]}
+        for msg in messages
+    ]
+
+async def _create_context_cache(system_instruction: str | None, messages: list[dict], ttl: int) -> str:
+    def create():
+        config = {"contents": to_contents(messages), "ttl": f"{ttl}s"}
+        if system_instruction:
+            config["system_instruction"] = system_instruction
+        return client.caches.create(model=GEMINI_MODEL, config=config).name
+    return await asyncio.to_thread(create)
+
+async def _delete_context_cache(name: str):
+    await asyncio.to_thread(client.caches.delete, name=name)
+
+context_cache = ContextCacheManager(_create_context_cache, _delete_context_cache) if client and CONTEXT_CACHE_ENABLED else None
+
+def _build_request(prompt, system_instruction: str | None = None, session_id: str | None = None):
+    """
+    Return (contents, config) for a plain prompt string or a structured message
+    list. For message lists with a session_id, a cached prefix is referenced when
+    one matches and only the newer messages are sent.
+    """
+    if isinstance(prompt, str):
+        return prompt, ({"system_instruction": system_instruction} if system_instruction else None)
+
+    messages = prompt
+    cached_name = None
+    if session_id and context_cache:
+        cached_name, messages = context_cache.lookup(session_id, system_instruction, prompt)
+        context_cache.refresh(session_id, system_instruction, prompt)
+    if cached_name:
+        # The system instruction lives in the cache and must not be sent again
+        return to_contents(messages), {"cached_content": cached_name}
+    return to_contents(messages), ({"system_instruction": system_instruction} if system_instruction else None)
+
+def _generate(contents, config=None) -> str:
+    gen_response = client.models.generate_content(model=GEMINI_MODEL, contents=contents, config=config)
+    return getattr(gen_response, "text", str(gen_response))
+
+async def _generate_async(contents, config=None) -> str:
+    gen_response = await client.aio.models.generate_content(model=GEMINI_MODEL, contents=contents, config=config)
+    return getattr(gen_response, "text", str(gen_response))
+
+async def _acquire_slot(sample_latency: bool = True):
+    """
+    Wait for Gemini's rate/AIMD limiter and a pool slot. Returns the callback
+    that releases both once the call has finished.
+    """
+    _llm_stats["waiting"] += 1
+    _llm_stats["max_waiting"] = max(_llm_stats["max_waiting"], _llm_stats["waiting"])
+    try:
+        permit = await gemini_limiter.acquire()
+        try:
+            await _llm_slots.acquire()
+        except BaseException:
+            permit.release(sample_latency=False)
+            raise
+    finally:
+        _llm_stats["waiting"] -= 1
+    _llm_stats["in_flight"] += 1
+
+    def release(future):
+        _llm_stats["in_flight"] -= 1
+        _llm_slots.release()
+        error = None if future.cancelled() else future.exception()
+        permit.release(error=error, sample_latency=sample_latency)
+    return release
+
+async def query_gemini_async(prompt: str | list[dict], timeout: float | None = None,
+                             system_instruction: str | None = None, session_id: str | None = None,
+                             deadline: Deadline | None = None) -> str | None:
     """
-    Query Gemini LLM with a prompt. Returns string reply or None.
+    Query Gemini on the bounded LLM executor. `prompt` is a string or a list of
+    chat messages (sent as multi-turn contents, with system_instruction kept
+    separate). Returns string reply or None on failure or when the call
+    exceeds `timeout` (defaults to LLM_TIMEOUT) or `deadline`, whichever is first.
+    With GEMINI_HEDGE_ENABLED a slow call is hedged with a second one (see
+    services.hedging); calls then go through the async client so the losing
+    request is really cancelled.
     """
     if not client or not GEMINI_KEY:
         return None
     try:
-        gen_response = client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-        return getattr(gen_response, "text", str(gen_response))
+        # While Gemini is failing the breaker answers None at once instead of waiting out the timeout
+        return await gemini_breaker.call(_hedged_query, prompt, timeout, system_instruction, session_id,
+                                         deadline or NO_DEADLINE)
+    except DeadlineExceeded:
+        _llm_stats["timeouts"] += 1
+        print("LLM (Gemini) stopped: turn deadline reached")
+        return None
     except Exception as e:
         print("LLM (Gemini) error:", e)
         return None
+
+async def _acquire_slot_within(deadline: Deadline, sample_latency: bool = True):
+    return await deadline.wait(_acquire_slot(sample_latency))
+
+async def _hedged_query(prompt, timeout: float | None, system_instruction: str | None, session_id: str | None,
+                        deadline: Deadline) -> str | None:
+    deadline.check()
+    # Built once: both attempts of a hedged call send the same request (and touch the context cache once)
+    contents, config = _build_request(prompt, system_instruction, session_id)
+    return await gemini_hedger.run(lambda: _query(contents, config, timeout, deadline))
+
+async def _query(contents, config, timeout: float | None, deadline: Deadline) -> str | None:
+    """Raises for provider failures (429/5xx, timeouts, connection errors); None for rejected requests."""
+    deadline.check()
+    release_slot = await _acquire_slot_within(deadline)
+    loop = asyncio.get_running_loop()
+    start = time.monotonic()
+    cancellable = gemini_hedger.enabled
+    if cancellable:
+        # A hedge loser must stop at once: the async client's request ends with its task
+        future = asyncio.ensure_future(_generate_async(contents, config))
+    else:
+        future = loop.run_in_executor(_llm_executor, _generate, contents, config)
+    # The slot is held until the call really finishes (the task is cancelled, or the worker
+    # thread returns), so abandoned calls still count against the concurrency limit.
+    future.add_done_callback(release_slot)
+    try:
+        text = await asyncio.wait_for(asyncio.shield(future), deadline.cap(timeout or LLM_TIMEOUT))
+    except DeadlineExceeded:
+        raise
+    except asyncio.TimeoutError:
+        if deadline.expired:
+            raise DeadlineExceeded() from None
+        _llm_stats["timeouts"] += 1
+        raise ProviderError(f"timed out after {timeout or LLM_TIMEOUT}s") from None
+    except Exception as e:
+        _llm_stats["failed"] += 1
+        if is_provider_failure(error=e):
+            raise
+        print("LLM (Gemini) error:", e)
+        return None
+    finally:
+        if cancellable:
+            future.cancel()  # no-op once done; otherwise a timeout or lost hedge ends the request
+    _llm_stats["completed"] += 1
+    _llm_stats["total_latency"] += time.monotonic() - start
+    return text
+
+_STREAM_END = object()
+
+def _stream_worker(contents, config, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, stop: threading.Event):
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    try:
+        for chunk in client.models.generate_content_stream(model=GEMINI_MODEL, contents=contents, config=config):
+            if stop.is_set():
+                break
+            text = getattr(chunk, "text", None)
+            if text:
+                put(text)
+    except Exception as e:
+        put(e)
+        raise  # also on the executor future, so the limiter sees 429s/5xx
+    finally:
+        put(_STREAM_END)
+
+async def stream_gemini(prompt: str | list[dict], timeout: float | None = None,
+                        system_instruction: str | None = None, session_id: str | None = None,
+                        deadline: Deadline | None = None):
+    """
+    Stream a Gemini reply, yielding text deltas as they are generated.
+    Takes the same prompt forms as query_gemini_async. Runs on the bounded
+    LLM executor; on failure, timeout or once `deadline` passes the stream
+    just ends early (nothing is yielded when the client is unavailable).
+    """
+    if not client or not GEMINI_KEY:
+        return
+    deadline = deadline or NO_DEADLINE
+    if deadline.expired or not gemini_breaker.allow():
+        return
+
+    contents, config = _build_request(prompt, system_instruction, session_id)
+    # A stream's duration tracks the reply length, not provider load: no latency sample
+    try:
+        release_slot = await _acquire_slot_within(deadline, sample_latency=False)
+    except DeadlineExceeded:
+        gemini_breaker.abandon()
+        _llm_stats["timeouts"] += 1
+        print("LLM (Gemini) stream skipped: turn deadline reached")
+        return
+    except asyncio.CancelledError:
+        gemini_breaker.abandon()
+        raise
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    start = time.monotonic()
+    future = loop.run_in_executor(_llm_executor, _stream_worker, contents, config, loop, queue, stop)
+    future.add_done_callback(release_slot)
+    # remaining() rather than cap(): the worker is already running, an expired deadline just times out below
+    stream_timeout = min(timeout or LLM_TIMEOUT, deadline.remaining())
+    ends_at = loop.time() + stream_timeout
+    # The breaker judges time to first token; a stream's length tracks the reply, not provider health
+    first_token = None
+    recorded = False
+    try:
+        while True:
+            item = await asyncio.wait_for(queue.get(), max(ends_at - loop.time(), 0))
+            if item is _STREAM_END:
+                _llm_stats["completed"] += 1
+                _llm_stats["total_latency"] += time.monotonic() - start
+                gemini_breaker.record(True, (first_token or time.monotonic()) - start)
+                recorded = True
+                return
+            if isinstance(item, Exception):
+                _llm_stats["failed"] += 1
+                gemini_breaker.record(not is_provider_failure(error=item), time.monotonic() - start)
+                recorded = True
+                print("LLM (Gemini) stream error:", item)
+                return
+            if first_token is None:
+                first_token = time.monotonic()
+            yield item
+    except asyncio.TimeoutError:
+        _llm_stats["timeouts"] += 1
+        if not deadline.expired:
+            gemini_breaker.record(False, time.monotonic() - start)
+            recorded = True  # otherwise our budget ran out: no verdict on Gemini
+        print("LLM (Gemini) stream timed out after", round(stream_timeout, 1), "s")
+    finally:
+        if not recorded:
+            gemini_breaker.abandon()  # consumer stopped early: no verdict, free a half-open probe
+        # Consumer stopped early or timed out: let the worker thread bail out
+        stop.set()
+
+def get_llm_stats() -> dict:
+    """Snapshot of LLM executor load: queue depth, in-flight calls and outcomes."""
+    stats = dict(_llm_stats)
+    total_latency = stats.pop("total_latency")
+    stats["avg_latency"] = round(total_latency / stats["completed"], 3) if stats["completed"] else None
+    stats["max_concurrency"] = LLM_MAX_CONCURRENCY
+    stats["timeout"] = LLM_TIMEOUT
+    if context_cache:
+        stats["context_cache"] = context_cache.snapshot()
+    return stats
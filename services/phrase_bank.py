@@ -0,0 +1,87 @@
+import os
+import time
+import asyncio
+import random
+
+from services.tts_service import generate_murf_audio
+from services.voice_pipeline import read_local_audio
+
+FILLER_ENABLED = os.getenv("FILLER_ENABLED", "1") == "1"
+# Send a filler only when the reply's first audio is expected later than this (seconds)
+FILLER_MIN_LATENCY = float(os.getenv("FILLER_MIN_LATENCY", "1.5"))
+# A failed warm-up is retried after this long, doubling on each failure up to FILLER_RETRY_MAX
+FILLER_RETRY_INTERVAL = float(os.getenv("FILLER_RETRY_INTERVAL", "60"))
+FILLER_RETRY_MAX = float(os.getenv("FILLER_RETRY_MAX", "900"))
+FILLER_PHRASES = [
+    "Let me check.",
+    "One moment.",
+    "Hmm, let me think.",
+    "Okay, give me a second.",
+    "Sure, just a moment.",
+]
+
+class PhraseBank:
+    """
+    Short acknowledgements synthesized once per voice and kept in memory.
+    The first request for a voice only starts the background synthesis; until
+    it has finished, pick() returns None and the turn goes without a filler.
+    A failed synthesis is retried with exponential backoff, so turns during
+    a Murf outage do not keep adding calls to it.
+    """
+
+    def __init__(self, phrases: list[str] = FILLER_PHRASES):
+        self.phrases = phrases
+        self._clips: dict[str, list[tuple[str, bytes]]] = {}
+        self._warming: dict[str, asyncio.Task] = {}
+        self._last: dict[str, int] = {}
+        self._failures: dict[str, int] = {}
+        self._retry_at: dict[str, float] = {}
+        self.stats = {"sent": 0, "not_ready": 0}
+
+    def warm(self, voice_id: str):
+        """Synthesize the bank for voice_id in the background (no-op once done or running)."""
+        if voice_id in self._clips or voice_id in self._warming:
+            return
+        if time.monotonic() < self._retry_at.get(voice_id, 0.0):
+            return
+        task = asyncio.create_task(self._synthesize(voice_id))
+        self._warming[voice_id] = task
+        task.add_done_callback(lambda _t: self._warming.pop(voice_id, None))
+
+    async def _synthesize(self, voice_id: str):
+        urls = await asyncio.gather(*(generate_murf_audio(p, voice_id=voice_id) for p in self.phrases))
+        clips = []
+        for phrase, url in zip(self.phrases, urls):
+            # Murf files land in the TTS cache, so restarts re-read them instead of calling Murf again
+            data = await read_local_audio(url)
+            if data:
+                clips.append((phrase, data))
+        if clips:
+            self._clips[voice_id] = clips
+            self._failures.pop(voice_id, None)
+            self._retry_at.pop(voice_id, None)
+        else:
+            failures = self._failures[voice_id] = self._failures.get(voice_id, 0) + 1
+            backoff = min(FILLER_RETRY_INTERVAL * 2 ** (failures - 1), FILLER_RETRY_MAX)
+            self._retry_at[voice_id] = time.monotonic() + backoff
+            print(f"Warning: no filler phrases synthesized for voice {voice_id}, retrying in {backoff:.0f}s")
+
+    def pick(self, voice_id: str) -> tuple[str, bytes] | None:
+        """A (phrase, mp3 bytes) pair, never the same one twice in a row, or None if not ready."""
+        clips = self._clips.get(voice_id)
+        if not clips:
+            self.warm(voice_id)
+            self.stats["not_ready"] += 1
+            return None
+        choices = [i for i in range(len(clips)) if i != self._last.get(voice_id)] or [0]
+        index = random.choice(choices)
+        self._last[voice_id] = index
+        self.stats["sent"] += 1
+        return clips[index]
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "voices": {voice: len(clips) for voice, clips in self._clips.items()},
+            "warming": sorted(self._warming),
+        }
@@ -0,0 +1,168 @@
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+from services.latency import EWMA
+from services.deadline import Deadline
+
+# AIMD: add ~1 slot per window of healthy completions, halve on 429/5xx/timeouts
+AIMD_DECREASE_FACTOR = 0.5
+# A completion is healthy when its latency is within this factor of the provider's average
+AIMD_LATENCY_TOLERANCE = float(os.getenv("AIMD_LATENCY_TOLERANCE", "2.0"))
+
+def is_overload(status: int | None = None, error: BaseException | None = None) -> bool:
+    """429, 5xx and timeouts mean the provider is at capacity; other errors do not."""
+    if error is not None:
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+            return True
+        status = getattr(error, "code", None) or getattr(error, "status", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+class TokenBucket:
+    """Request-rate limit: `rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class Permit:
+    """One admitted provider call; release() reports how it went."""
+
+    def __init__(self, limiter: "ProviderLimiter"):
+        self.limiter = limiter
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self, status: int | None = None, error: BaseException | None = None, sample_latency: bool = True):
+        if self.released:
+            return
+        self.released = True
+        latency = time.monotonic() - self.started if sample_latency else None
+        self.limiter._complete(is_overload(status, error), latency)
+
+class ProviderLimiter:
+    """
+    Token bucket for request rate plus an AIMD concurrency window for one
+    provider. The window grows while completions are healthy and is halved,
+    at most once per average latency, when the provider answers 429/5xx or
+    times out, so it settles at what the provider can actually sustain.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_concurrency: int,
+                 min_concurrency: int = 1, initial_concurrency: int | None = None):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(initial_concurrency or max(min_concurrency, max_concurrency // 2))
+        self.inflight = 0
+        self.latency = EWMA(alpha=0.1)
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self.stats = {"requests": 0, "overloads": 0, "increases": 0, "decreases": 0}
+
+    async def acquire(self) -> Permit:
+        await self.bucket.acquire()
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.inflight -= 1  # granted just before the cancel: hand the slot on
+                    self._wake()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+        self.stats["requests"] += 1
+        return Permit(self)
+
+    @asynccontextmanager
+    async def slot(self, deadline: Deadline | None = None):
+        """
+        async with limiter.slot() as permit: ... (set the outcome with permit.release(status=...)).
+        With a deadline, waiting for the slot raises DeadlineExceeded once it passes.
+        """
+        permit = await (deadline.wait(self.acquire()) if deadline else self.acquire())
+        try:
+            yield permit
+        except BaseException as e:
+            permit.release(error=e, sample_latency=not isinstance(e, asyncio.CancelledError))
+            raise
+        finally:
+            permit.release()
+
+    def _wake(self):
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    def _complete(self, overloaded: bool, latency: float | None):
+        self.inflight -= 1
+        now = time.monotonic()
+        if overloaded:
+            self.stats["overloads"] += 1
+            # One halving per congestion episode, not one per failed request in flight
+            if now - self._last_decrease > self.latency.get(default=1.0):
+                self.limit = max(self.min_concurrency, self.limit * AIMD_DECREASE_FACTOR)
+                self._last_decrease = now
+                self.stats["decreases"] += 1
+        elif latency is not None:
+            healthy = latency <= AIMD_LATENCY_TOLERANCE * self.latency.get(default=latency)
+            self.latency.update(latency)
+            if healthy and self.limit < self.max_concurrency and self.inflight + 1 >= int(self.limit):
+                # Only grow when the window was actually the constraint
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.stats["increases"] += 1
+        self._wake()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "waiting": len(self._waiters),
+            "tokens": round(self.bucket.tokens, 2),
+            "rate": self.bucket.rate,
+            "latency": self.latency.snapshot(),
+        }
+
+def _limiter_from_env(name: str, rate: float, burst: float, max_concurrency: int) -> ProviderLimiter:
+    prefix = name.upper()
+    return ProviderLimiter(
+        name,
+        rate=float(os.getenv(f"{prefix}_RATE_LIMIT", str(rate))),
+        burst=float(os.getenv(f"{prefix}_RATE_BURST", str(burst))),
+        max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(max_concurrency))),
+    )
+
+assemblyai_limiter = _limiter_from_env("assemblyai", rate=5, burst=10, max_concurrency=32)
+murf_limiter = _limiter_from_env("murf", rate=5, burst=10, max_concurrency=16)
+gemini_limiter = _limiter_from_env("gemini", rate=5, burst=10, max_concurrency=8)
+
+def get_provider_limits() -> dict:
+    return {limiter.name: limiter.snapshot() for limiter in (assemblyai_limiter, murf_limiter, gemini_limiter)}
@@ -0,0 +1,74 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "300"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+
+def normalize_prompt(text: str) -> str:
+    """Collapse whitespace and case so trivially different prompts share an entry."""
+    return " ".join(text.split()).casefold()
+
+class ResponseCache:
+    """
+    TTL + size-bounded LRU cache of LLM replies. Concurrent misses for the
+    same key are coalesced into a single upstream call (single flight).
+    Failed calls (None) are not cached.
+    """
+
+    def __init__(self, ttl: float = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(prompt: str, **params) -> str:
+        payload = json.dumps([normalize_prompt(prompt), sorted(params.items())], default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str | None]]) -> str | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["misses"] += 1
+            # Own task, so one caller disconnecting does not cancel the call for the others
+            task = asyncio.create_task(self._fill(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[str | None]]) -> str | None:
+        value = await compute()
+        if value is not None:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return value
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        served = self.stats["hits"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "hit_rate": round(served / lookups, 3) if lookups else None,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,133 @@
+import os
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass, field
+
+STORAGE_SWEEP_INTERVAL = float(os.getenv("STORAGE_SWEEP_INTERVAL", "300"))
+
+@dataclass
+class ManagedDir:
+    """A directory whose generated files are swept by age and kept under quota."""
+    name: str
+    path: Path
+    pattern: str = "*"
+    recursive: bool = True
+    max_bytes: int | None = None
+    max_files: int | None = None
+    ttl: float | None = None
+    usage: dict = field(default_factory=lambda: {"files": 0, "bytes": 0, "removed": 0, "last_sweep": None})
+
+def shard_name(filename: str) -> str:
+    """Two hex chars of the name's hash: 256 subdirectories per managed directory."""
+    return hashlib.sha1(filename.encode("utf-8")).hexdigest()[:2]
+
+class StorageManager:
+    """
+    Keeps uploads and generated audio bounded: new files go into sharded
+    subdirectories, and a background task deletes files past their TTL and
+    then the oldest files until each directory is back under its quotas.
+    """
+
+    def __init__(self, sweep_interval: float = STORAGE_SWEEP_INTERVAL):
+        self.sweep_interval = sweep_interval
+        self.dirs: dict[str, ManagedDir] = {}
+        self._task: asyncio.Task | None = None
+        self._writes: set[asyncio.Task] = set()
+
+    def add(self, managed: ManagedDir):
+        managed.path.mkdir(parents=True, exist_ok=True)
+        self.dirs[managed.name] = managed
+
+    def shard_path(self, name: str, filename: str) -> Path:
+        """Path for a new file in managed directory `name`, creating its shard directory."""
+        shard_dir = self.dirs[name].path / shard_name(filename)
+        shard_dir.mkdir(exist_ok=True)
+        return shard_dir / filename
+
+    def write_in_background(self, name: str, filename: str, data: bytes):
+        """Archive data into managed directory `name` without blocking the caller."""
+        def write():
+            self.shard_path(name, filename).write_bytes(data)
+
+        async def run():
+            try:
+                await asyncio.to_thread(write)
+            except OSError as e:
+                print(f"Archiving {filename} failed:", e)
+
+        task = asyncio.create_task(run())
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    def sweep(self, managed: ManagedDir) -> int:
+        """Apply TTL and quotas to one directory (blocking; run it off the event loop)."""
+        now = time.time()
+        files = []
+        candidates = managed.path.rglob(managed.pattern) if managed.recursive else managed.path.glob(managed.pattern)
+        for path in candidates:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if path.is_file():
+                files.append((st.st_mtime, st.st_size, path))
+        files.sort()
+
+        total_bytes = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            expired = managed.ttl is not None and now - mtime > managed.ttl
+            over_bytes = managed.max_bytes is not None and total_bytes > managed.max_bytes
+            over_files = managed.max_files is not None and len(files) - removed > managed.max_files
+            if not (expired or over_bytes or over_files):
+                break  # oldest first: nothing newer can be expired either
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total_bytes -= size
+            removed += 1
+
+        managed.usage.update({
+            "files": len(files) - removed,
+            "bytes": total_bytes,
+            "removed": managed.usage["removed"] + removed,
+            "last_sweep": now,
+        })
+        return removed
+
+    def sweep_all(self):
+        for managed in self.dirs.values():
+            try:
+                self.sweep(managed)
+            except Exception as e:
+                print(f"Storage sweep failed for {managed.name}:", e)
+
+    async def _run(self):
+        while True:
+            await asyncio.to_thread(self.sweep_all)
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def footprint(self) -> dict:
+        """Usage per managed directory as of its last sweep."""
+        return {
+            name: {**managed.usage, "max_bytes": managed.max_bytes, "max_files": managed.max_files, "ttl": managed.ttl}
+            for name, managed in self.dirs.items()
+        }
@@ -1,61 +1,189 @@
+import io
 import os
+import wave
 import asyncio
-import aiohttp
+
+from services.http_client import get_http_session, request_timeout
+from services.provider_limits import assemblyai_limiter
+from services.circuit_breaker import assemblyai_breaker, ProviderError, is_provider_failure
+from services.deadline import Deadline, DeadlineExceeded, NO_DEADLINE
 
 ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
 
-async def transcribe_with_assemblyai(filepath: str):
+# Adaptive polling: first poll is timed from the clip length, then quick polls
+# that back off exponentially up to POLL_MAX_DELAY.
+POLL_BASE_DELAY = float(os.getenv("STT_POLL_BASE_DELAY", "0.5"))
+POLL_REALTIME_FACTOR = float(os.getenv("STT_POLL_REALTIME_FACTOR", "0.15"))
+POLL_MIN_DELAY = float(os.getenv("STT_POLL_MIN_DELAY", "0.3"))
+POLL_MAX_DELAY = float(os.getenv("STT_POLL_MAX_DELAY", "3"))
+POLL_BACKOFF = 1.5
+POLL_MAX_WAIT = float(os.getenv("STT_POLL_MAX_WAIT", "120"))
+# Browser webm/opus is at most ~128 kbps, so this under- rather than over-estimates duration
+COMPRESSED_BYTES_PER_SECOND = 16000
+
+# Optional completion webhook: AssemblyAI POSTs to this public URL (our /stt/webhook
+# route) and the waiting coroutine wakes immediately. With several workers most webhooks
+# reach one with no waiter, so the adaptive polls stay on, backing off to a higher cap.
+ASSEMBLYAI_WEBHOOK_URL = os.getenv("ASSEMBLYAI_WEBHOOK_URL")
+ASSEMBLYAI_WEBHOOK_SECRET = os.getenv("ASSEMBLYAI_WEBHOOK_SECRET")
+WEBHOOK_AUTH_HEADER = "X-Webhook-Secret"
+WEBHOOK_POLL_MAX_DELAY = float(os.getenv("STT_WEBHOOK_POLL_MAX_DELAY", "5"))
+
+_transcript_waiters: dict[str, asyncio.Future] = {}
+
+def estimate_audio_seconds(data, size_hint: int | None = None) -> float:
+    """Rough clip duration from a WAV header, or from the byte size for compressed audio."""
+    if size_hint is not None:
+        size = size_hint
+    elif isinstance(data, (bytes, bytearray)):
+        if data[:4] == b"RIFF":
+            try:
+                with wave.open(io.BytesIO(data)) as w:
+                    return w.getnframes() / w.getframerate()
+            except (wave.Error, EOFError):
+                pass
+        size = len(data)
+    else:
+        try:
+            size = os.fstat(data.fileno()).st_size
+        except (AttributeError, OSError, ValueError):
+            return 0.0
+    return size / COMPRESSED_BYTES_PER_SECOND
+
+def poll_delays(audio_seconds: float, webhook: bool = False):
+    """
+    Yield the wait before each transcript poll until POLL_MAX_WAIT is used up.
+    With a webhook the schedule is the same, only the backoff cap is higher.
+    """
+    max_delay = WEBHOOK_POLL_MAX_DELAY if webhook else POLL_MAX_DELAY
+
+    def schedule():
+        yield min(max(POLL_BASE_DELAY + audio_seconds * POLL_REALTIME_FACTOR, POLL_MIN_DELAY), max_delay)
+        delay = POLL_MIN_DELAY
+        while True:
+            yield delay
+            delay = min(delay * POLL_BACKOFF, max_delay)
+
+    waited = 0.0
+    for delay in schedule():
+        if waited >= POLL_MAX_WAIT:
+            return
+        yield delay
+        waited += delay
+
+def notify_transcript_ready(transcript_id: str, status: str | None = None) -> bool:
+    """Wake the coroutine waiting on transcript_id (called from the webhook route)."""
+    waiter = _transcript_waiters.get(transcript_id)
+    if waiter is None or waiter.done():
+        return False
+    waiter.set_result(status)
+    return True
+
+async def transcribe_audio_data(data, size_hint: int | None = None, audio_seconds: float | None = None,
+                                deadline: Deadline | None = None):
     """
-    Upload file to AssemblyAI and transcribe. Returns transcript text or None on failure.
+    Upload audio to AssemblyAI and transcribe. `data` may be bytes, an open
+    binary file or an async iterator of byte chunks (streamed straight into
+    the upload request); pass size_hint for iterators so polling can be timed,
+    or audio_seconds when the duration is known. Request timeouts and polling
+    are capped to `deadline`.
+    Returns transcript text or None on failure.
     """
     if not ASSEMBLYAI_API_KEY:
         print("AssemblyAI key missing")
         return None
+    try:
+        # While AssemblyAI is failing the breaker answers None at once instead of waiting out timeouts
+        return await assemblyai_breaker.call(_transcribe, data, size_hint, audio_seconds, deadline or NO_DEADLINE)
+    except DeadlineExceeded:
+        print("AssemblyAI transcription stopped: turn deadline reached")
+        return None
+    except Exception as e:
+        print("AssemblyAI exception:", e)
+        return None
 
+async def _transcribe(data, size_hint: int | None, audio_seconds: float | None, deadline: Deadline):
+    """Raises for provider failures (429/5xx, timeouts, connection errors); None for rejected audio."""
     upload_url = "https://api.assemblyai.com/v2/upload"
     headers = {"authorization": ASSEMBLYAI_API_KEY}
     try:
-        async with aiohttp.ClientSession() as session:
-            with open(filepath, "rb") as f:
-                async with session.post(upload_url, headers=headers, data=f, timeout=120) as up_res:
-                    if up_res.status not in (200, 201):
-                        print("AssemblyAI upload failed status:", up_res.status)
-                        return None
-                    up_json = await up_res.json()
-                    audio_url = up_json.get("upload_url")
-                    if not audio_url:
-                        print("AssemblyAI upload missing upload_url")
-                        return None
+        deadline.check()
+        session = get_http_session()
+        async with assemblyai_limiter.slot(deadline) as permit, \
+                session.post(upload_url, headers=headers, data=data, timeout=request_timeout(deadline.cap(120))) as up_res:
+            permit.release(status=up_res.status)
+            if up_res.status not in (200, 201):
+                if is_provider_failure(up_res.status):
+                    raise ProviderError(f"AssemblyAI upload failed status {up_res.status}", up_res.status)
+                print("AssemblyAI upload failed status:", up_res.status)
+                return None
+            up_json = await up_res.json()
+            audio_url = up_json.get("upload_url")
+            if not audio_url:
+                print("AssemblyAI upload missing upload_url")
+                return None
+
+        transcript_endpoint = "https://api.assemblyai.com/v2/transcript"
+        payload = {"audio_url": audio_url}
+        if ASSEMBLYAI_WEBHOOK_URL:
+            payload["webhook_url"] = ASSEMBLYAI_WEBHOOK_URL
+            if ASSEMBLYAI_WEBHOOK_SECRET:
+                payload["webhook_auth_header_name"] = WEBHOOK_AUTH_HEADER
+                payload["webhook_auth_header_value"] = ASSEMBLYAI_WEBHOOK_SECRET
+        deadline.check()
+        async with assemblyai_limiter.slot(deadline) as permit, \
+                session.post(transcript_endpoint, headers=headers, json=payload, timeout=request_timeout(deadline.cap(60))) as t_res:
+            permit.release(status=t_res.status)
+            if t_res.status not in (200, 201):
+                if is_provider_failure(t_res.status):
+                    raise ProviderError(f"AssemblyAI transcript start failed {t_res.status}", t_res.status)
+                print("AssemblyAI transcript start failed:", t_res.status)
+                return None
+            t_json = await t_res.json()
+            transcript_id = t_json.get("id")
+            if not transcript_id:
+                print("AssemblyAI transcript missing id")
+                return None
 
-            transcript_endpoint = "https://api.assemblyai.com/v2/transcript"
-            payload = {"audio_url": audio_url}
-            async with session.post(transcript_endpoint, headers=headers, json=payload, timeout=60) as t_res:
-                if t_res.status not in (200, 201):
-                    print("AssemblyAI transcript start failed:", t_res.status)
-                    return None
-                t_json = await t_res.json()
-                transcript_id = t_json.get("id")
-                if not transcript_id:
-                    print("AssemblyAI transcript missing id")
-                    return None
-
-            polling_url = f"https://api.assemblyai.com/v2/transcript/{transcript_id}"
-            for _ in range(60):
-                async with session.get(polling_url, headers=headers, timeout=30) as p_res:
+        polling_url = f"https://api.assemblyai.com/v2/transcript/{transcript_id}"
+        waiter = None
+        if ASSEMBLYAI_WEBHOOK_URL:
+            waiter = asyncio.get_running_loop().create_future()
+            _transcript_waiters[transcript_id] = waiter
+        try:
+            if audio_seconds is None:
+                audio_seconds = estimate_audio_seconds(data, size_hint)
+            for delay in poll_delays(audio_seconds, webhook=waiter is not None):
+                delay = deadline.cap(delay)
+                if waiter is not None:
+                    # Returns as soon as the webhook fires; the poll below then fetches the text
+                    await asyncio.wait({waiter}, timeout=delay)
+                    if waiter.done():
+                        waiter = None
+                else:
+                    await asyncio.sleep(delay)
+                deadline.check()
+                # Polls are most of a turn's requests, so throttling shows up here first
+                async with assemblyai_limiter.slot(deadline) as permit, \
+                        session.get(polling_url, headers=headers, timeout=request_timeout(deadline.cap(30))) as p_res:
+                    permit.release(status=p_res.status)
                     if p_res.status != 200:
                         print("AssemblyAI poll error:", p_res.status)
-                        await asyncio.sleep(1.5)
                         continue
                     p_json = await p_res.json()
                     status = p_json.get("status")
                     if status == "completed":
                         return p_json.get("text")
                     if status == "error":
+                        # e.g. undecodable or empty audio: the upload's fault, not AssemblyAI's
                         print("AssemblyAI reported error:", p_json.get("error"))
                         return None
-                await asyncio.sleep(2)
-            print("AssemblyAI transcription timed out")
-            return None
+            raise ProviderError("AssemblyAI transcription timed out")
+        finally:
+            _transcript_waiters.pop(transcript_id, None)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        print("AssemblyAI exception:", e)
-        return None
+        if deadline.expired:
+            raise DeadlineExceeded() from e  # a timeout cut short by the turn budget
+        raise
@@ -0,0 +1,181 @@
+import io
+import os
+import json
+import wave
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import aiohttp
+
+from services.http_client import get_http_session
+from services.stt_service import ASSEMBLYAI_API_KEY, transcribe_audio_data
+from services.deadline import Deadline, DeadlineExceeded, NO_DEADLINE
+
+# "realtime" streams PCM over AssemblyAI's socket API; "batch" uploads the finished utterance
+STT_ENGINE = os.getenv("STT_ENGINE", "realtime")
+# Point at tools/fake_stt_server.py (ws://127.0.0.1:8765/v3/ws) to run offline
+ASSEMBLYAI_REALTIME_URL = os.getenv("ASSEMBLYAI_REALTIME_URL", "wss://streaming.assemblyai.com/v3/ws")
+REALTIME_SAMPLE_RATE = 16000
+# Longest utterance buffered per turn; 16 kHz PCM16 is the densest format clients send (32 kB/s)
+MAX_UTTERANCE_SECONDS = float(os.getenv("STT_MAX_UTTERANCE_SECONDS", "60"))
+MAX_UTTERANCE_BYTES = int(MAX_UTTERANCE_SECONDS * REALTIME_SAMPLE_RATE * 2)
+
+@dataclass
+class TranscriptEvent:
+    text: str
+    final: bool
+
+class STTEngine(ABC):
+    """
+    Turns a stream of audio chunks into transcript events: any number of
+    partial events, then exactly one final event with the whole utterance
+    (empty text on failure). `deadline` bounds the work left once the chunks
+    end; callers that only know it at end of speech may set its expires_at
+    before they end the chunk stream.
+    """
+    name = "base"
+    # What the client must send: "webm" (MediaRecorder chunks) or "pcm16" (16 kHz mono s16le)
+    audio_format = "webm"
+
+    @abstractmethod
+    def transcribe_stream(self, chunks: AsyncIterator[bytes],
+                          deadline: Deadline = NO_DEADLINE) -> AsyncIterator[TranscriptEvent]:
+        """Async generator of TranscriptEvents for one utterance."""
+
+class BatchAssemblyAIEngine(STTEngine):
+    """Buffers the utterance and runs the upload+poll transcription once it ends."""
+    name = "batch"
+    audio_format = "webm"
+
+    async def transcribe_stream(self, chunks, deadline: Deadline = NO_DEADLINE):
+        buffered: list[bytes] = []
+        size = 0
+        async for chunk in chunks:
+            # Audio past the cap is dropped, not buffered
+            if size < MAX_UTTERANCE_BYTES:
+                buffered.append(chunk)
+                size += len(chunk)
+        data = b"".join(buffered)
+        text = await transcribe_audio_data(data, deadline=deadline) if data else None
+        yield TranscriptEvent(text or "", final=True)
+
+def pcm16_to_wav(pcm: bytes, sample_rate: int = REALTIME_SAMPLE_RATE) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm)
+    return buf.getvalue()
+
+class RealtimeAssemblyAIEngine(STTEngine):
+    """
+    Streams PCM to AssemblyAI's realtime socket and relays partial transcripts
+    while audio is still arriving. If the socket fails, the audio received so
+    far is wrapped as WAV and sent through the batch path instead.
+    """
+    name = "realtime"
+    audio_format = "pcm16"
+
+    def __init__(self, url: str = ASSEMBLYAI_REALTIME_URL, sample_rate: int = REALTIME_SAMPLE_RATE):
+        self.url = url
+        self.sample_rate = sample_rate
+
+    async def transcribe_stream(self, chunks, deadline: Deadline = NO_DEADLINE):
+        received = bytearray()
+        committed: list[str] = []
+        done = False
+        sender = watchdog = None
+        try:
+            try:
+                session = get_http_session()
+                params = {"sample_rate": str(self.sample_rate), "encoding": "pcm_s16le", "format_turns": "true"}
+                headers = {"Authorization": ASSEMBLYAI_API_KEY or ""}
+                async with session.ws_connect(self.url, params=params, headers=headers, heartbeat=15) as ws:
+                    sender = asyncio.create_task(self._send_audio(ws, chunks, received))
+                    watchdog = asyncio.create_task(self._close_at_deadline(ws, sender, deadline))
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        event = json.loads(msg.data)
+                        if event.get("type") == "Turn":
+                            transcript = event.get("transcript", "")
+                            if event.get("end_of_turn") and event.get("turn_is_formatted"):
+                                if transcript:
+                                    committed.append(transcript)
+                                yield TranscriptEvent(" ".join(committed), final=False)
+                            elif transcript:
+                                yield TranscriptEvent(" ".join(committed + [transcript]), final=False)
+                        elif event.get("type") == "Termination":
+                            done = True
+                            break
+                        elif event.get("error"):
+                            print("AssemblyAI realtime error:", event.get("error"))
+                            break
+            except Exception as e:
+                print("AssemblyAI realtime exception:", e)
+
+            if done or deadline.expired:
+                # Out of time for the batch path: the turns committed so far are the transcript
+                yield TranscriptEvent(" ".join(committed), final=True)
+                return
+
+            # Socket failed part-way: keep buffering until the utterance ends, then use the batch path
+            print("Warning: realtime STT unavailable, falling back to batch transcription")
+            if sender:
+                await sender
+            else:
+                async for chunk in chunks:
+                    self._keep(received, chunk)
+            pcm = bytes(received)
+            text = await transcribe_audio_data(pcm16_to_wav(pcm, self.sample_rate), deadline=deadline) if pcm else None
+            yield TranscriptEvent(text or "", final=True)
+        finally:
+            for task in (sender, watchdog):
+                if task and not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _keep(received: bytearray, chunk: bytes):
+        """Buffer a chunk for the batch fallback, up to MAX_UTTERANCE_BYTES."""
+        if len(received) < MAX_UTTERANCE_BYTES:
+            received += chunk
+
+    @staticmethod
+    async def _close_at_deadline(ws, sender: asyncio.Task, deadline: Deadline):
+        """Once the utterance has ended, close the socket if Termination has not arrived by `deadline`."""
+        await asyncio.wait({sender})
+        try:
+            timeout = deadline.cap()
+            if timeout is None:
+                return
+            await asyncio.sleep(timeout)
+        except DeadlineExceeded:
+            pass
+        await ws.close()
+
+    @classmethod
+    async def _send_audio(cls, ws, chunks, received: bytearray):
+        # Never cancelled mid-stream on socket errors: it keeps collecting audio for the fallback
+        async for chunk in chunks:
+            cls._keep(received, chunk)
+            if ws.closed:
+                continue
+            try:
+                await ws.send_bytes(chunk)
+            except Exception:
+                pass
+        if not ws.closed:
+            try:
+                await ws.send_str(json.dumps({"type": "Terminate"}))
+            except Exception:
+                pass
+
+def get_stt_engine(name: str | None = None) -> STTEngine:
+    """Return the configured STT engine (STT_ENGINE env var: "realtime" or "batch")."""
+    name = name or STT_ENGINE
+    if name == "realtime" and ASSEMBLYAI_API_KEY:
+        return RealtimeAssemblyAIEngine()
+    return BatchAssemblyAIEngine()
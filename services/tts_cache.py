@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from collections import OrderedDict
+from dataclasses import dataclass
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+TTS_CACHE_DIR = STATIC_DIR / "tts_cache"
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+TTS_CACHE_MAX_ENTRIES = int(os.getenv("TTS_CACHE_MAX_ENTRIES", "5000"))
+TTS_CACHE_MAX_AGE = float(os.getenv("TTS_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+@dataclass
+class CacheEntry:
+    path: Path
+    size: int
+    created: float
+    etag: str | None = None  # sha256 of the stored bytes; a re-synthesized entry gets a new one
+
+def file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+class TTSCache:
+    """
+    Content-addressed store for synthesized audio. Blobs live on disk under
+    static/tts_cache/<sha256[:2]>/<sha256>.mp3; an in-memory LRU index tracks them and
+    evicts by total size, entry count and age.
+    """
+
+    def __init__(self, directory: Path = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES,
+                 max_entries: int = TTS_CACHE_MAX_ENTRIES, max_age: float = TTS_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._index: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, fmt: str = "mp3") -> str:
+        return hashlib.sha256(json.dumps([text, voice_id, fmt]).encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        # Sharded by hash prefix so no single directory grows huge
+        shard_dir = self.directory / key[:2]
+        shard_dir.mkdir(exist_ok=True)
+        return shard_dir / f"{key}.mp3"
+
+    def url_for(self, key: str) -> str:
+        return f"/static/{self.directory.relative_to(STATIC_DIR).as_posix()}/{key[:2]}/{key}.mp3"
+
+    def _load_index(self):
+        # Rebuild from disk, oldest first, so restarts keep roughly the same LRU order
+        files = []
+        for path in self.directory.glob("*/*.mp3"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, path, st.st_size))
+        for mtime, path, size in sorted(files):
+            self._index[path.stem] = CacheEntry(path, size, mtime)
+            self.total_bytes += size
+        self._evict()
+
+    def lookup(self, key: str) -> str | None:
+        """Return the local URL for key, or None on a miss. No network or disk access."""
+        entry = self._index.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if time.time() - entry.created > self.max_age:
+            self._remove(key)
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._index.move_to_end(key)
+        self.stats["hits"] += 1
+        return self.url_for(key)
+
+    def add(self, key: str, path: Path):
+        """Register a blob that has just been written to path_for(key)."""
+        try:
+            size = path.stat().st_size
+            etag = file_digest(path)
+        except OSError:
+            return
+        old = self._index.pop(key, None)
+        if old:
+            self.total_bytes -= old.size
+        self._index[key] = CacheEntry(path, size, time.time(), etag)
+        self.total_bytes += size
+        self._evict()
+
+    def etag(self, key: str) -> str | None:
+        """
+        Content hash of the entry's bytes, for a strong ETag. The key only names
+        the (text, voice) request, and Murf output differs between syntheses.
+        Entries found on disk at startup are hashed on first use.
+        """
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        if entry.etag is None:
+            try:
+                entry.etag = file_digest(entry.path)
+            except OSError:
+                return None
+        return entry.etag
+
+    def _remove(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size
+        try:
+            entry.path.unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        now = time.time()
+        while self._index:
+            key, entry = next(iter(self._index.items()))
+            if self.total_bytes > self.max_bytes or len(self._index) > self.max_entries:
+                self.stats["evictions"] += 1
+            elif now - entry.created > self.max_age:
+                self.stats["expired"] += 1
+            else:
+                break
+            self._remove(key)
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else None,
+            "entries": len(self._index),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+tts_cache = TTSCache()
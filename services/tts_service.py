@@ -1,36 +1,81 @@
 import os
+import json
+import hmac
 import time
 import uuid
-import aiohttp
+import zlib
+import base64
+import asyncio
+import hashlib
 from pathlib import Path
+from typing import AsyncIterator
+
+from services.http_client import get_http_session, request_timeout
+from services.tts_cache import tts_cache
+from services.provider_limits import murf_limiter
+from services.circuit_breaker import murf_breaker, ProviderError, is_provider_failure
+from services.hedging import murf_hedger
+from services.deadline import Deadline, DeadlineExceeded, NO_DEADLINE
 
 MURF_API_KEY = os.getenv("MURF_API_KEY")
 STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+MURF_STREAM_URL = "https://api.murf.ai/v1/speech/stream"
+# Stream URLs handed to clients stay valid this long (seconds)
+TTS_STREAM_TTL = float(os.getenv("TTS_STREAM_TTL", "300"))
+TTS_STREAM_CHUNK_SIZE = 16 * 1024
+# Signs the text and voice carried in stream URLs, so any worker (or a restarted one) can serve
+# them. Must be the same on every worker; derived from the Murf key when not set.
+TTS_STREAM_SECRET = (os.getenv("TTS_STREAM_SECRET")
+                     or hashlib.sha256(f"tts-stream:{MURF_API_KEY or ''}".encode("utf-8")).hexdigest())
 
-async def download_url_to_file(url: str, dest: Path):
+async def download_url_to_file(url: str, dest: Path, timeout: float = 60):
     """Download a remote URL into dest (async)."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=60) as resp:
-                if resp.status != 200:
-                    print("Download failed with status:", resp.status)
-                    return False
-                data = await resp.read()
-                dest.write_bytes(data)
-                return True
+        session = get_http_session()
+        async with session.get(url, timeout=request_timeout(timeout)) as resp:
+            if resp.status != 200:
+                print("Download failed with status:", resp.status)
+                return False
+            data = await resp.read()
+            # Write then rename so readers never see a half-written file; unique because
+            # a hedged request may download the same key twice
+            tmp_path = dest.with_name(f"{dest.name}.{uuid.uuid4().hex}.part")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, dest)
+            return True
     except Exception as e:
         print("Download exception:", e)
         return False
 
-async def generate_murf_audio(text: str, voice_id: str = "en-IN-aarav"):
+async def generate_murf_audio(text: str, voice_id: str = "en-IN-aarav", deadline: Deadline | None = None):
     """
     Call Murf TTS API to generate audio.
     Returns an audio URL (external) or saved local file path (string), or None on failure.
+    Identical (text, voice) requests are served from the local TTS cache without a network call,
+    even once `deadline` has passed; otherwise the request is capped to it. With MURF_HEDGE_ENABLED
+    a slow request is hedged with a second one (see services.hedging).
     """
+    cache_key = tts_cache.make_key(text, voice_id)
+    cached_url = tts_cache.lookup(cache_key)
+    if cached_url:
+        return cached_url
+
     if not MURF_API_KEY:
         print("Warning: Murf API key missing")
         return None
+    try:
+        # While Murf is failing the breaker answers None at once and callers use their fallback
+        deadline = deadline or NO_DEADLINE
+        return await murf_breaker.call(murf_hedger.run, lambda: _request_murf_audio(text, voice_id, cache_key, deadline))
+    except DeadlineExceeded:
+        print("Murf TTS skipped: turn deadline reached")
+        return None
+    except Exception as e:
+        print("Murf TTS error:", e)
+        return None
 
+async def _request_murf_audio(text: str, voice_id: str, cache_key: str, deadline: Deadline):
+    """Raises for provider failures (429/5xx, timeouts, connection errors); None for rejected requests."""
     url = "https://api.murf.ai/v1/speech/generate"
     headers = {
         "accept": "application/json",
@@ -44,31 +89,137 @@ async def generate_murf_audio(text: str, voice_id: str = "en-IN-aarav"):
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, headers=headers, timeout=120) as resp:
-                if resp.status != 200:
-                    print("Murf API returned status:", resp.status)
-                    return None
-
-                data = await resp.json()
-                audio_url = data.get("audioFile") or data.get("audio_file") or data.get("audio_url") or data.get("audioFileUrl")
-
-                if audio_url:
-                    try:
-                        # Download locally for stable serving
-                        local_name = f"murf_{int(time.time())}_{uuid.uuid4().hex[:8]}.mp3"
-                        local_path = STATIC_DIR / local_name
-                        if await download_url_to_file(audio_url, local_path):
-                            return f"/static/{local_name}"
-                    except Exception as e:
-                        print("Warning: Could not download Murf audio locally:", e)
-
-                    # fallback to remote URL
-                    return audio_url
-
-                print("Warning: Murf response missing audio URL")
+        deadline.check()
+        session = get_http_session()
+        async with murf_limiter.slot(deadline) as permit, \
+                session.post(url, json=payload, headers=headers, timeout=request_timeout(deadline.cap(120))) as resp:
+            if resp.status != 200:
+                permit.release(status=resp.status)
+                if is_provider_failure(resp.status):
+                    raise ProviderError(f"Murf API returned status {resp.status}", resp.status)
+                print("Murf API returned status:", resp.status)
                 return None
 
+            data = await resp.json()
+            permit.release(status=resp.status)  # the download below is not a Murf API call
+            audio_url = data.get("audioFile") or data.get("audio_file") or data.get("audio_url") or data.get("audioFileUrl")
+
+            if audio_url:
+                try:
+                    # Download into the cache for stable local serving
+                    local_path = tts_cache.path_for(cache_key)
+                    if not deadline.expired and await download_url_to_file(audio_url, local_path, deadline.cap(60)):
+                        tts_cache.add(cache_key, local_path)
+                        return tts_cache.url_for(cache_key)
+                except Exception as e:
+                    print("Warning: Could not download Murf audio locally:", e)
+
+                # fallback to remote URL
+                return audio_url
+
+            print("Warning: Murf response missing audio URL")
+            return None
+
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        print("Murf TTS error:", e)
+        if deadline.expired:
+            raise DeadlineExceeded() from e  # a timeout cut short by the turn budget
+        raise
+
+def _sign(payload: str) -> str:
+    return hmac.new(TTS_STREAM_SECRET.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).hexdigest()
+
+def register_tts_stream(text: str, voice_id: str = "en-IN-aarav") -> str:
+    """
+    Return a /tts/stream/ URL for text without synthesizing anything yet; the
+    audio is produced while the client downloads it. The path is the TTS cache
+    key, so once the stream has completed it is served from the cache; the
+    signed token in the query carries the request itself, so no worker needs
+    to remember it.
+    """
+    key = tts_cache.make_key(text, voice_id)
+    request = json.dumps([text, voice_id, int(time.time() + TTS_STREAM_TTL)]).encode("utf-8")
+    payload = base64.urlsafe_b64encode(zlib.compress(request)).decode("ascii").rstrip("=")
+    return f"/tts/stream/{key}?t={payload}.{_sign(payload)}"
+
+def parse_tts_stream_token(key: str, token: str | None) -> tuple[str, str] | None:
+    """(text, voice_id) from a stream URL's token, or None if it is forged, expired or for another key."""
+    payload, _, signature = (token or "").partition(".")
+    if not payload or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        request = zlib.decompress(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        text, voice_id, expires_at = json.loads(request)
+    except (ValueError, TypeError, zlib.error):
         return None
+    if expires_at < time.time() or tts_cache.make_key(text, voice_id) != key:
+        return None
+    return text, voice_id
+
+async def open_tts_stream(key: str, token: str | None) -> AsyncIterator[bytes] | None:
+    """
+    Start Murf streaming synthesis for the request signed into `token`.
+    Returns an async iterator of MP3 chunks as Murf produces them (also
+    written to the TTS cache), or None if the token is invalid or the
+    request failed.
+    """
+    request = parse_tts_stream_token(key, token)
+    if request is None:
+        return None
+    text, voice_id = request
+    if not MURF_API_KEY:
+        print("Warning: Murf API key missing")
+        return None
+    if not murf_breaker.allow():
+        return None
+
+    headers = {"api-key": MURF_API_KEY, "Content-Type": "application/json"}
+    payload = {"text": text, "voiceId": voice_id, "format": "MP3"}
+    try:
+        permit = await murf_limiter.acquire()
+    except asyncio.CancelledError:
+        murf_breaker.abandon()
+        raise
+    started = time.monotonic()
+    try:
+        session = get_http_session()
+        resp = await session.post(MURF_STREAM_URL, json=payload, headers=headers, timeout=request_timeout(120))
+    except Exception as e:
+        permit.release(error=e)
+        murf_breaker.record(not is_provider_failure(error=e), time.monotonic() - started)
+        print("Murf stream error:", e)
+        return None
+    except asyncio.CancelledError:
+        permit.release(sample_latency=False)
+        murf_breaker.abandon()
+        raise
+    # Time to first byte is what the window and breaker judge; the body streams at playback pace
+    permit.release(status=resp.status)
+    murf_breaker.record(not is_provider_failure(resp.status), time.monotonic() - started)
+    if resp.status != 200:
+        print("Murf stream returned status:", resp.status)
+        resp.release()
+        return None
+    return _tee_to_cache(resp, key)
+
+async def _tee_to_cache(resp, key: str):
+    path = tts_cache.path_for(key)
+    # Unique temp name: two clients may stream the same key at once
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.part")
+    complete = False
+    try:
+        with open(tmp_path, "wb") as f:
+            async for chunk in resp.content.iter_chunked(TTS_STREAM_CHUNK_SIZE):
+                f.write(chunk)
+                yield chunk
+        complete = True
+    except Exception as e:
+        print("Murf stream interrupted:", e)
+    finally:
+        resp.release()
+        if complete:
+            os.replace(tmp_path, path)
+            tts_cache.add(key, path)
+        else:
+            tmp_path.unlink(missing_ok=True)
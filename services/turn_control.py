@@ -0,0 +1,125 @@
+import os
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from services.latency import EWMA
+from services.deadline import Deadline, DeadlineExceeded, NO_DEADLINE
+
+MAX_INFLIGHT_TURNS = int(os.getenv("MAX_INFLIGHT_TURNS", "32"))
+# Shed a turn when its predicted wait for a slot exceeds this (seconds)
+ADMISSION_MAX_QUEUE_DELAY = float(os.getenv("ADMISSION_MAX_QUEUE_DELAY", "5"))
+
+class Overloaded(Exception):
+    """Raised by AdmissionController.admit() when a turn is shed."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"overloaded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+@dataclass
+class _SessionLock:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0  # turns holding or waiting for the lock
+
+class SessionTurnLocks:
+    """
+    Serializes turns of one session in arrival order (asyncio.Lock wakes
+    waiters FIFO). Each session has its own lock, so unrelated sessions never
+    wait on each other; the entry is dropped once no turn holds or waits for
+    it, so memory follows the sessions with a turn in progress.
+    """
+
+    def __init__(self):
+        self._locks: dict[str, _SessionLock] = {}
+        self.stats = {"expired": 0}
+
+    @asynccontextmanager
+    async def hold(self, session_id: str, deadline: Deadline = NO_DEADLINE):
+        """Hold the session's lock; DeadlineExceeded if the wait outlasts `deadline`."""
+        entry = self._locks.setdefault(session_id, _SessionLock())
+        entry.users += 1
+        try:
+            try:
+                await deadline.wait(entry.lock.acquire())
+            except DeadlineExceeded:
+                self.stats["expired"] += 1
+                raise
+            try:
+                yield
+            finally:
+                entry.lock.release()
+        finally:
+            entry.users -= 1
+            if not entry.users:
+                del self._locks[session_id]
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "sessions": len(self._locks),
+            "waiting": sum(entry.users - entry.lock.locked() for entry in self._locks.values()),
+        }
+
+class AdmissionController:
+    """
+    Global cap on turns in flight. Turns beyond the cap queue for a slot, but
+    only while the predicted wait (queue length x average turn latency /
+    slots) stays under max_queue_delay; past that they fail fast instead of
+    making every queued turn slower. A turn whose deadline runs out while it
+    queues gets DeadlineExceeded.
+    """
+
+    def __init__(self, max_inflight: int = MAX_INFLIGHT_TURNS, max_queue_delay: float = ADMISSION_MAX_QUEUE_DELAY):
+        self.max_inflight = max_inflight
+        self.max_queue_delay = max_queue_delay
+        self.inflight = 0
+        self.waiting = 0
+        self.latency = EWMA()
+        self._slots = asyncio.Semaphore(max_inflight)
+        self.stats = {"admitted": 0, "rejected": 0, "expired": 0}
+
+    def predicted_wait(self) -> float:
+        if self.inflight < self.max_inflight:
+            return 0.0
+        return (self.waiting + 1) * self.latency.get(default=1.0) / self.max_inflight
+
+    @asynccontextmanager
+    async def admit(self, deadline: Deadline = NO_DEADLINE):
+        wait = self.predicted_wait()
+        if wait > self.max_queue_delay:
+            self.stats["rejected"] += 1
+            raise Overloaded(wait)
+        self.waiting += 1
+        try:
+            await deadline.wait(self._slots.acquire())
+        except DeadlineExceeded:
+            self.stats["expired"] += 1
+            raise
+        finally:
+            self.waiting -= 1
+        self.inflight += 1
+        self.stats["admitted"] += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            self._slots.release()
+            self.latency.update(time.monotonic() - started)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "max_inflight": self.max_inflight,
+            "predicted_wait": round(self.predicted_wait(), 3),
+            "turn_latency": self.latency.snapshot(),
+        }
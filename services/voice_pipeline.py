@@ -0,0 +1,112 @@
+import re
+import asyncio
+from typing import AsyncIterator
+
+from services.tts_service import generate_murf_audio, STATIC_DIR
+from services.deadline import Deadline
+
+# Sentence end (optionally followed by a closing quote/bracket) that is followed by whitespace,
+# so "3.5" or a sentence still being streamed is never cut.
+_SENTENCE_BOUNDARY = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+_CLAUSE_BOUNDARY = re.compile(r"[,;:]\s+")
+_ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "prof.", "st.", "vs.", "etc.", "e.g.", "i.e.", "approx."}
+
+class SentenceSegmenter:
+    """
+    Incrementally split streamed LLM text into sentences for TTS. Very short
+    sentences are merged with the next one; runs longer than max_chars are
+    cut at the last clause boundary (or space) so TTS never waits too long.
+    """
+
+    def __init__(self, min_chars: int = 12, max_chars: int = 220):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, delta: str) -> list[str]:
+        self.buffer += delta
+        segments = []
+        start = 0
+        for m in _SENTENCE_BOUNDARY.finditer(self.buffer):
+            candidate = self.buffer[start:m.end()].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower() if candidate else ""
+            if last_word in _ABBREVIATIONS or len(candidate) < self.min_chars:
+                continue
+            segments.append(candidate)
+            start = m.end()
+        self.buffer = self.buffer[start:]
+
+        while len(self.buffer) > self.max_chars:
+            head = self.buffer[:self.max_chars]
+            cut = max((m.end() for m in _CLAUSE_BOUNDARY.finditer(head)), default=0)
+            if cut < self.max_chars // 2:
+                cut = head.rfind(" ") + 1 or self.max_chars
+            segments.append(self.buffer[:cut].strip())
+            self.buffer = self.buffer[cut:]
+        return [seg for seg in segments if seg]
+
+    def flush(self) -> list[str]:
+        text = self.buffer.strip()
+        self.buffer = ""
+        return [text] if text else []
+
+async def segment_stream(deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Turn a stream of LLM text deltas into a stream of complete sentences."""
+    segmenter = SentenceSegmenter()
+    async for delta in deltas:
+        for sentence in segmenter.feed(delta):
+            yield sentence
+    for sentence in segmenter.flush():
+        yield sentence
+
+async def synthesize_in_order(sentences: AsyncIterator[str], voice_id: str = "en-IN-aarav",
+                              deadline: Deadline | None = None):
+    """
+    Start TTS for each sentence as soon as it arrives and yield
+    (index, sentence, audio_url) in sentence order. audio_url is None
+    when synthesis failed for that sentence or did not fit before `deadline`.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def producer():
+        try:
+            async for sentence in sentences:
+                task = asyncio.create_task(generate_murf_audio(sentence, voice_id=voice_id, deadline=deadline))
+                await queue.put((sentence, task))
+        finally:
+            await queue.put(None)
+
+    producer_task = asyncio.create_task(producer())
+    pending = []
+    try:
+        index = 0
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            sentence, task = item
+            pending.append(task)
+            audio_url = await task
+            yield index, sentence, audio_url
+            index += 1
+        await producer_task
+    finally:
+        # Consumer went away (e.g. client disconnected): stop queued synthesis.
+        producer_task.cancel()
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                pending.append(item[1])
+        for task in pending:
+            task.cancel()
+
+async def read_local_audio(audio_url: str) -> bytes | None:
+    """Load a /static/ audio file produced by the TTS service, off the event loop."""
+    if not audio_url or not audio_url.startswith("/static/"):
+        return None
+    path = STATIC_DIR / audio_url[len("/static/"):]
+    try:
+        return await asyncio.to_thread(path.read_bytes)
+    except OSError as e:
+        print("Warning: could not read audio file:", e)
+        return None
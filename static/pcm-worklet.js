@@ -0,0 +1,48 @@
+// AudioWorklet: resample the mic to 16 kHz mono and post Int16 PCM chunks
+// (used when the server's STT engine streams raw PCM).
+class PcmCaptureProcessor extends AudioWorkletProcessor {
+  constructor(options) {
+    super();
+    const opts = options.processorOptions || {};
+    this.ratio = sampleRate / (opts.targetRate || 16000);
+    this.chunkSamples = Math.round((opts.targetRate || 16000) * (opts.chunkMs || 100) / 1000);
+    this.buffer = new Int16Array(this.chunkSamples);
+    this.filled = 0;
+    this.pos = 0;   // fractional read position, carried across render quanta
+
+    this.port.onmessage = (e) => {
+      if (e.data === "flush") {
+        if (this.filled) this.port.postMessage(this.buffer.slice(0, this.filled).buffer);
+        this.filled = 0;
+        this.port.postMessage("flushed");
+      }
+    };
+  }
+
+  push(sample) {
+    const s = Math.max(-1, Math.min(1, sample));
+    this.buffer[this.filled++] = s < 0 ? s * 0x8000 : s * 0x7fff;
+    if (this.filled === this.chunkSamples) {
+      this.port.postMessage(this.buffer.buffer, [this.buffer.buffer]);
+      this.buffer = new Int16Array(this.chunkSamples);
+      this.filled = 0;
+    }
+  }
+
+  process(inputs) {
+    const channel = inputs[0] && inputs[0][0];
+    if (!channel) return true;
+    // Linear interpolation down to the target rate
+    while (this.pos < channel.length) {
+      const i = Math.floor(this.pos);
+      const frac = this.pos - i;
+      const next = i + 1 < channel.length ? channel[i + 1] : channel[i];
+      this.push(channel[i] + (next - channel[i]) * frac);
+      this.pos += this.ratio;
+    }
+    this.pos -= channel.length;
+    return true;
+  }
+}
+
+registerProcessor("pcm-capture", PcmCaptureProcessor);
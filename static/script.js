@@ -24,6 +24,35 @@ const replyAudio = document.getElementById("replyAudio");
 let mediaRecorder = null;
 let chunks = [];
 
+// ---------- Streaming mode (WebSocket) ----------
+// Default when WebSockets are available; add ?mode=batch to the URL for the upload path.
+const STREAM_MODE = "WebSocket" in window && new URL(window.location.href).searchParams.get("mode") !== "batch";
+const STREAM_TIMESLICE_MS = 250;
+// Upload path: reply audio framed into the chat response ("inline", one round trip) by default;
+// ?audio=stream plays it from a URL that is synthesized while it downloads.
+const BATCH_AUDIO = new URL(window.location.href).searchParams.get("audio") || "inline";
+const INLINE_AUDIO_TYPE = "application/vnd.voice-agent.audio-frame";
+let socket = null;
+let pendingAudio = null;   // header of the binary audio frame that follows
+let playbackQueue = [];
+let isPlaying = false;
+let turnDone = true;
+let liveUserBubble = null;
+let liveAssistantBubble = null;
+let socketAudioFormat = "webm";   // announced by the server's "ready" message
+let pcmCapture = null;            // AudioWorklet capture when the server wants raw PCM
+let pcmSampleRate = 16000;
+
+// ---------- Voice activity detection ----------
+// Ends the utterance after trailing silence and keeps silence out of the upload.
+// ?vad=off disables it; ?vad_silence=<ms> sets how much trailing silence ends an utterance.
+const VAD_PARAMS = new URL(window.location.href).searchParams;
+const VAD_ENABLED = "AudioWorkletNode" in window && VAD_PARAMS.get("vad") !== "off";
+const VAD_SILENCE_MS = Number(VAD_PARAMS.get("vad_silence")) || 900;
+const VAD_NO_SPEECH_MS = 8000;   // give up if nothing is said
+const VAD_PREROLL_MS = 300;      // audio kept from just before the detected onset
+let capture = null;              // per-utterance audio graph: { stream, context, source, heard, ... }
+
 // ---------- Conversation helpers ----------
 function appendMessage(role, text) {
   const wrapper = document.createElement("div");
@@ -36,6 +65,13 @@ function appendMessage(role, text) {
   convo.scrollTop = convo.scrollHeight;
 }
 
+function resetToReady() {
+  recordBtn.disabled = false;
+  recordBtn.classList.remove("recording");
+  micLabel.textContent = "Start Recording";
+  setStatus("idle", "Ready");
+}
+
 function setStatus(state, label) {
   statusText.textContent = label;
   statusDot.classList.remove("idle", "recording", "playing");
@@ -43,17 +79,303 @@ function setStatus(state, label) {
   else if (state === "playing") statusDot.classList.add("playing");
 }
 
+// Framed response: 4-byte big-endian JSON length, JSON metadata, audio bytes
+async function readChatResponse(res) {
+  if (!(res.headers.get("Content-Type") || "").startsWith(INLINE_AUDIO_TYPE)) return res.json();
+  const buf = await res.arrayBuffer();
+  const length = new DataView(buf).getUint32(0);
+  const data = JSON.parse(new TextDecoder().decode(new Uint8Array(buf, 4, length)));
+  if (data.audio_bytes) {
+    const audio = new Uint8Array(buf, 4 + length, data.audio_bytes);
+    data.audio_url = URL.createObjectURL(new Blob([audio], { type: data.audio_mime || "audio/mpeg" }));
+  }
+  return data;
+}
+
+// ---------- Streaming turn handling ----------
+function openSocket() {
+  return new Promise((resolve, reject) => {
+    if (socket && socket.readyState === WebSocket.OPEN) return resolve(socket);
+    const proto = window.location.protocol === "https:" ? "wss" : "ws";
+    const ws = new WebSocket(`${proto}://${window.location.host}/ws/agent/${SESSION_ID}`);
+    ws.binaryType = "arraybuffer";
+    ws.onmessage = (event) => {
+      const ready = typeof event.data === "string" ? JSON.parse(event.data) : null;
+      if (ready && ready.type === "ready") {
+        socketAudioFormat = ready.audio_format || "webm";
+        pcmSampleRate = ready.sample_rate || 16000;
+        ws.onmessage = handleSocketMessage;
+        socket = ws;
+        resolve(ws);
+      }
+    };
+    ws.onerror = (err) => reject(err);
+    ws.onclose = () => {
+      socket = null;
+      if (!turnDone) {
+        turnDone = true;
+        appendMessage("assistant", "⚠️ Connection lost.");
+        resetToReady();
+      }
+    };
+  });
+}
+
+function showUserText(text, final) {
+  if (!liveUserBubble) {
+    appendMessage("user", text);
+    liveUserBubble = convo.lastElementChild.querySelector(".bubble");
+  } else {
+    liveUserBubble.textContent = text;
+  }
+  if (final) liveUserBubble = null;
+}
+
+function enqueueAudio(item) {
+  playbackQueue.push(item);
+  if (!isPlaying) playNext();
+}
+
+function finishIfIdle() {
+  if (turnDone && !isPlaying && playbackQueue.length === 0) resetToReady();
+}
+
+function playNext() {
+  const item = playbackQueue.shift();
+  if (!item) {
+    isPlaying = false;
+    finishIfIdle();
+    return;
+  }
+  isPlaying = true;
+  setStatus("playing", "Playing reply…");
+
+  if (item.blob || item.url) {
+    const src = item.blob ? URL.createObjectURL(item.blob) : item.url;
+    replyAudio.src = src;
+    replyAudio.onended = () => {
+      if (item.blob) URL.revokeObjectURL(src);
+      playNext();
+    };
+    replyAudio.play().catch((err) => { console.error(err); playNext(); });
+  } else if ("speechSynthesis" in window) {
+    // No server audio for this sentence: speak it locally
+    const u = new SpeechSynthesisUtterance(item.text);
+    u.onend = playNext;
+    window.speechSynthesis.speak(u);
+  } else {
+    playNext();
+  }
+}
+
+function handleSocketMessage(event) {
+  if (event.data instanceof ArrayBuffer) {
+    const header = pendingAudio || {};
+    pendingAudio = null;
+    enqueueAudio({ blob: new Blob([event.data], { type: header.mime || "audio/mpeg" }), text: header.text });
+    return;
+  }
+
+  let msg;
+  try { msg = JSON.parse(event.data); } catch { return; }
+
+  switch (msg.type) {
+    case "transcript":
+      showUserText(msg.text, msg.final);
+      if (msg.final) setStatus("idle", "Thinking…");
+      break;
+    case "llm_delta":
+      if (!liveAssistantBubble) {
+        appendMessage("assistant", "");
+        liveAssistantBubble = convo.lastElementChild.querySelector(".bubble");
+      }
+      liveAssistantBubble.textContent += msg.text;
+      convo.scrollTop = convo.scrollHeight;
+      break;
+    case "llm_text":
+      // Final reply text (also covers the fallback reply when nothing was streamed)
+      if (liveAssistantBubble) liveAssistantBubble.textContent = msg.text;
+      else appendMessage("assistant", msg.text);
+      liveAssistantBubble = null;
+      break;
+    case "filler":   // short acknowledgement while the reply is prepared; bytes follow
+    case "audio":
+      if (msg.mime) pendingAudio = msg;   // bytes arrive in the next frame
+      else enqueueAudio({ url: msg.url, text: msg.text });
+      break;
+    case "error":
+      appendMessage("assistant", `⚠️ ${msg.error}`);
+      if (msg.audio_url) enqueueAudio({ url: msg.audio_url });
+      turnDone = true;
+      finishIfIdle();
+      break;
+    case "done":
+      turnDone = true;
+      finishIfIdle();
+      break;
+  }
+}
+
+function finishStreamingUtterance() {
+  if (socket && socket.readyState === WebSocket.OPEN) {
+    socket.send(JSON.stringify({ type: "end" }));
+  } else {
+    turnDone = true;
+    appendMessage("assistant", "⚠️ Connection lost.");
+    resetToReady();
+  }
+}
+
+function openCapture(stream) {
+  const context = new AudioContext();
+  capture = {
+    stream, context, source: context.createMediaStreamSource(stream),
+    heard: !VAD_ENABLED, preroll: [], paused: false, held: [],
+  };
+}
+
+function closeCapture() {
+  if (!capture) return;
+  capture.source.disconnect();
+  capture.stream.getTracks().forEach((t) => t.stop());
+  capture.context.close();
+  capture = null;
+}
+
+async function startPcmCapture() {
+  const { context, source } = capture;
+  await context.audioWorklet.addModule("/static/pcm-worklet.js");
+  const node = new AudioWorkletNode(context, "pcm-capture", {
+    processorOptions: { targetRate: pcmSampleRate, chunkMs: 100 },
+  });
+  node.port.onmessage = (e) => {
+    if (e.data === "flushed") {
+      node.disconnect();
+      closeCapture();
+      finishStreamingUtterance();
+    } else if (!capture || !socket) {
+      return;
+    } else if (capture.heard && !capture.paused) {
+      socket.send(e.data);
+    } else if (capture.heard) {
+      // Speech paused: held until it resumes, dropped if this turns out to be the trailing silence
+      capture.held.push(e.data);
+    } else {
+      // Before speech onset only the last VAD_PREROLL_MS is kept (chunks are 100 ms)
+      capture.preroll.push(e.data);
+      if (capture.preroll.length > Math.ceil(VAD_PREROLL_MS / 100)) capture.preroll.shift();
+    }
+  };
+  source.connect(node);
+  node.connect(context.destination);   // keeps the node pulled; it outputs silence
+  pcmCapture = { node };
+}
+
+function stopPcmCapture() {
+  pcmCapture.node.port.postMessage("flush");
+  pcmCapture = null;
+}
+
+// MediaRecorder input: with VAD the recorder only starts at speech onset, so it
+// records through a delay line that still holds the first syllable.
+function recorderStream() {
+  if (!VAD_ENABLED) return capture.stream;
+  const delay = capture.context.createDelay(1);
+  delay.delayTime.value = VAD_PREROLL_MS / 1000;
+  const destination = capture.context.createMediaStreamDestination();
+  capture.source.connect(delay);
+  delay.connect(destination);
+  return destination.stream;
+}
+
+async function startVad() {
+  const { context, source } = capture;
+  await context.audioWorklet.addModule("/static/vad-worklet.js");
+  const node = new AudioWorkletNode(context, "vad", {
+    processorOptions: { silenceMs: VAD_SILENCE_MS, noSpeechMs: VAD_NO_SPEECH_MS },
+  });
+  node.port.onmessage = (e) => {
+    if (e.data === "speech_start") onSpeechStart();
+    else if (e.data === "pause") onSpeechPause();
+    else if (e.data === "resume") onSpeechResume();
+    else if (e.data === "speech_end") stopRecording();
+    else if (e.data === "no_speech") cancelRecording("No speech detected.");
+  };
+  source.connect(node);
+  node.connect(context.destination);
+}
+
+function onSpeechStart() {
+  if (!capture || capture.heard) return;
+  capture.heard = true;
+  if (mediaRecorder && mediaRecorder.state === "inactive") mediaRecorder.start(capture.timeslice);
+  if (socket) capture.preroll.forEach((chunk) => socket.send(chunk));
+  capture.preroll = [];
+}
+
+function onSpeechPause() {
+  if (capture) capture.paused = true;
+}
+
+function onSpeechResume() {
+  if (!capture) return;
+  if (socket) capture.held.forEach((chunk) => socket.send(chunk));
+  capture.held = [];
+  capture.paused = false;
+}
+
+// Drop an utterance in which nothing was said: no upload, no turn
+function cancelRecording(label) {
+  if (!capture) return;
+  if (pcmCapture) {
+    pcmCapture.node.port.onmessage = null;
+    pcmCapture.node.disconnect();
+    pcmCapture = null;
+  }
+  if (mediaRecorder) {
+    mediaRecorder.onstop = null;
+    if (mediaRecorder.state !== "inactive") mediaRecorder.stop();
+    mediaRecorder = null;
+  }
+  closeCapture();
+  turnDone = true;
+  resetToReady();
+  recordBtn.setAttribute("aria-pressed", "false");
+  setStatus("idle", label);
+}
+
+function isRecording() {
+  return capture !== null && !capture.stopping;
+}
+
 // ---------- Recording control ----------
 async function startRecording() {
-  if (mediaRecorder && mediaRecorder.state === "recording") return;
+  if (capture) return;   // still recording or flushing the previous utterance
 
   try {
     const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-    mediaRecorder = new MediaRecorder(stream);
+    const streaming = STREAM_MODE && await openSocket().then(() => true, () => false);
+    openCapture(stream);
+    if (streaming) turnDone = false;
+    if (streaming && socketAudioFormat === "pcm16") {
+      await startPcmCapture();
+      if (VAD_ENABLED) await startVad();
+      recordBtn.classList.add("recording");
+      recordBtn.setAttribute("aria-pressed", "true");
+      micLabel.textContent = "Stop Recording";
+      setStatus("recording", "Listening…");
+      return;
+    }
+
+    mediaRecorder = new MediaRecorder(recorderStream());
     chunks = [];
 
-    mediaRecorder.ondataavailable = (e) => chunks.push(e.data);
-    mediaRecorder.onstop = async () => {
+    if (streaming) {
+      mediaRecorder.ondataavailable = (e) => { if (e.data.size && socket) socket.send(e.data); };
+    } else {
+      mediaRecorder.ondataavailable = (e) => chunks.push(e.data);
+    }
+    const onStopped = streaming ? finishStreamingUtterance : async () => {
       const blob = new Blob(chunks, { type: "audio/webm" });
 
       // build formdata
@@ -62,16 +384,16 @@ async function startRecording() {
 
       setStatus("idle", "Processing…");
       try {
-        const res = await fetch(`/agent/chat/${SESSION_ID}`, { method: "POST", body: formData });
+        const res = await fetch(`/agent/chat/${SESSION_ID}?audio=${BATCH_AUDIO}`, { method: "POST", body: formData });
 
         if (!res.ok) {
           // Try to parse JSON error
           let msg = `Server error: ${res.status}`;
-          try { const j = await res.json(); if (j.error) msg = j.error; } catch {}
+          try { const j = await res.json(); if (j.error || j.detail) msg = j.error || j.detail; } catch {}
           throw new Error(msg);
         }
 
-        const data = await res.json();
+        const data = await readChatResponse(res);
 
         // update transcript and history
         if (data.transcription) appendMessage("user", data.transcription);
@@ -81,6 +403,7 @@ async function startRecording() {
         if (data.audio_url) {
           replyAudio.src = data.audio_url;
           replyAudio.onended = () =>{ // restart recording after playback
+          if (data.audio_url.startsWith("blob:")) URL.revokeObjectURL(data.audio_url);
           recordBtn.disabled = false;
           recordBtn.classList.remove("recording");
           micLabel.textContent="Start Recording";
@@ -140,7 +463,14 @@ async function startRecording() {
       }
     };
 
-    mediaRecorder.start();
+    mediaRecorder.onstop = () => {
+      closeCapture();
+      onStopped();
+    };
+
+    capture.timeslice = streaming ? STREAM_TIMESLICE_MS : undefined;
+    if (VAD_ENABLED) await startVad();   // the recorder starts at speech onset
+    else mediaRecorder.start(capture.timeslice);
     // UI state
     recordBtn.classList.add("recording");
     recordBtn.setAttribute("aria-pressed", "true");
@@ -148,6 +478,7 @@ async function startRecording() {
     setStatus("recording", "Listening…");
   } catch (err) {
     console.error("Mic error:", err);
+    closeCapture();
     setStatus("idle", "Mic access denied.");
     recordBtn.classList.remove("recording");
     recordBtn.setAttribute("aria-pressed", "false");
@@ -157,6 +488,20 @@ async function startRecording() {
 }
 
 function stopRecording() {
+  if (!isRecording()) return;
+  if (!capture.heard) {
+    cancelRecording("No speech detected.");
+    return;
+  }
+  capture.stopping = true;
+  if (pcmCapture) {
+    stopPcmCapture();
+    recordBtn.classList.remove("recording");
+    recordBtn.setAttribute("aria-pressed", "false");
+    micLabel.textContent = "Start Recording";
+    setStatus("idle", "Processing…");
+    return;
+  }
   if (!mediaRecorder) return;
   if (mediaRecorder.state === "recording") {
     mediaRecorder.stop();
@@ -173,7 +518,7 @@ function toggleRecording(forceStart = false) {
     startRecording();
     return;
   }
-  if (!mediaRecorder || mediaRecorder.state !== "recording") startRecording();
+  if (!isRecording()) startRecording();
   else stopRecording();
 }
 
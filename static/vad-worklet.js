@@ -0,0 +1,77 @@
+// AudioWorklet: energy-based voice activity detection on the raw mic signal.
+// Posts "speech_start" once speech has lasted onsetMs, "speech_end" after
+// silenceMs of trailing silence, and "no_speech" if nothing is heard within
+// noSpeechMs. While speaking, "pause" follows pauseMs of silence and "resume"
+// the speech after it, so the caller can hold back audio that may turn out to
+// be trailing silence. The threshold tracks the background noise floor.
+class VadProcessor extends AudioWorkletProcessor {
+  constructor(options) {
+    super();
+    const opts = options.processorOptions || {};
+    this.frameSamples = Math.round(sampleRate * 0.01);   // 10 ms frames
+    this.onsetFrames = Math.ceil((opts.onsetMs || 60) / 10);
+    this.silenceFrames = Math.ceil((opts.silenceMs || 900) / 10);
+    this.pauseFrames = Math.ceil((opts.pauseMs || 200) / 10);
+    this.noSpeechFrames = Math.ceil((opts.noSpeechMs || 8000) / 10);
+    this.minRms = opts.minRms || 0.01;
+    this.ratio = opts.ratio || 3;   // speech = this many times louder than the noise floor
+
+    this.noise = null;
+    this.sum = 0;
+    this.count = 0;
+    this.frames = 0;
+    this.speechRun = 0;
+    this.silenceRun = 0;
+    this.speaking = false;
+    this.done = false;
+  }
+
+  frame(rms) {
+    this.frames++;
+    const isSpeech = rms > Math.max(this.minRms, (this.noise || 0) * this.ratio);
+    if (!isSpeech && !this.speaking) {
+      this.noise = this.noise === null ? rms : 0.95 * this.noise + 0.05 * rms;
+    }
+
+    if (!this.speaking) {
+      this.speechRun = isSpeech ? this.speechRun + 1 : 0;
+      if (this.speechRun >= this.onsetFrames) {
+        this.speaking = true;
+        this.silenceRun = 0;
+        this.port.postMessage("speech_start");
+      } else if (this.frames >= this.noSpeechFrames) {
+        this.done = true;
+        this.port.postMessage("no_speech");
+      }
+      return;
+    }
+
+    if (isSpeech) {
+      if (this.silenceRun >= this.pauseFrames) this.port.postMessage("resume");
+      this.silenceRun = 0;
+      return;
+    }
+    if (++this.silenceRun === this.pauseFrames) this.port.postMessage("pause");
+    if (this.silenceRun >= this.silenceFrames) {
+      this.done = true;
+      this.port.postMessage("speech_end");
+    }
+  }
+
+  process(inputs) {
+    const channel = inputs[0] && inputs[0][0];
+    if (!channel || this.done) return !this.done;
+    for (let i = 0; i < channel.length; i++) {
+      this.sum += channel[i] * channel[i];
+      if (++this.count === this.frameSamples) {
+        this.frame(Math.sqrt(this.sum / this.count));
+        this.sum = 0;
+        this.count = 0;
+        if (this.done) break;
+      }
+    }
+    return !this.done;
+  }
+}
+
+registerProcessor("vad", VadProcessor);
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Tests import services/ and tools/ the way main.py does, from the project root
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
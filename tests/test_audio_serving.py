@@ -0,0 +1,23 @@
+import pytest
+
+from services.audio_serving import parse_byte_range
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("BYTES = 0-0", (0, 0)),
+])
+def test_single_ranges(header, expected):
+    assert parse_byte_range(header, 1000) == expected
+
+@pytest.mark.parametrize("header", ["items=0-10", "bytes=0-10,20-30", "bytes=abc", "bytes=a-b", "bytes=5"])
+def test_ignored_ranges(header):
+    assert parse_byte_range(header, 1000) is None
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1500-1600", "bytes=50-10"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, 1000)
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from services.circuit_breaker import CircuitBreaker, ProviderError, is_provider_failure, CLOSED, OPEN, HALF_OPEN
+from services.deadline import DeadlineExceeded
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = {"slow_call": 1.0, "window": 30, "min_calls": 4, "failure_rate": 0.5, "open_seconds": 0.05}
+    return CircuitBreaker("test", **{**options, **kwargs})
+
+class ClientError(Exception):
+    status = 400
+
+@pytest.mark.parametrize("status, error, expected", [
+    (500, None, True),
+    (429, None, True),
+    (404, None, False),
+    (None, ProviderError("down", 503), True),
+    (None, ProviderError("timed out"), True),
+    (None, ConnectionError("reset"), True),
+    (None, ClientError(), False),
+])
+def test_is_provider_failure(status, error, expected):
+    assert is_provider_failure(status, error) is expected
+
+def test_opens_when_failure_rate_is_reached():
+    breaker = make_breaker()
+    for ok in (True, True, False):
+        breaker.record(ok, 0.1)
+    assert breaker.state == CLOSED
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats["short_circuited"] == 1
+
+def test_slow_calls_count_as_bad():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(True, 5.0)
+    assert breaker.state == OPEN
+    assert breaker.stats["slow"] == 4
+
+def test_half_open_lets_one_probe_through():
+    breaker = make_breaker()
+    breaker._open(time.monotonic())
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+
+def test_failed_probe_reopens():
+    breaker = make_breaker()
+    breaker._open(time.monotonic())
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.stats["opened"] == 2
+
+def test_call_does_not_count_client_errors():
+    async def rejected():
+        raise ClientError()
+
+    async def scenario():
+        breaker = make_breaker()
+        for _ in range(6):
+            with pytest.raises(ClientError):
+                await breaker.call(rejected)
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == CLOSED
+    assert breaker.stats["failures"] == 0
+
+def test_call_opens_on_provider_failures_and_then_short_circuits():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise ProviderError("unavailable", 503)
+
+    async def scenario():
+        breaker = make_breaker()
+        for _ in range(4):
+            with pytest.raises(ProviderError):
+                await breaker.call(failing)
+        return breaker, await breaker.call(failing)
+
+    breaker, result = asyncio.run(scenario())
+    assert breaker.state == OPEN
+    assert result is None
+    assert len(calls) == 4
+
+def test_out_of_budget_calls_give_no_verdict():
+    async def out_of_budget():
+        raise DeadlineExceeded()
+
+    async def scenario():
+        breaker = make_breaker()
+        breaker._open(time.monotonic() - 1)
+        with pytest.raises(DeadlineExceeded):
+            await breaker.call(out_of_budget)
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    # The probe was freed, not failed: the next call may probe again
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert breaker.stats["calls"] == 0
+
+def test_cancelled_calls_give_no_verdict():
+    async def scenario():
+        breaker = make_breaker()
+        breaker._open(time.monotonic() - 1)
+        task = asyncio.create_task(breaker.call(asyncio.sleep, 5))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert breaker.stats["calls"] == 0
@@ -0,0 +1,58 @@
+import asyncio
+import math
+
+import pytest
+
+from services.deadline import Deadline, DeadlineExceeded, NO_DEADLINE
+
+def test_unbounded_deadline():
+    assert NO_DEADLINE.remaining() == math.inf
+    assert not NO_DEADLINE.expired
+    assert NO_DEADLINE.cap() is None
+    assert NO_DEADLINE.cap(5) == 5
+
+def test_cap_limits_timeout_to_time_left():
+    deadline = Deadline.after(10)
+    assert deadline.cap(60) <= 10
+    assert deadline.cap(1) == 1
+    assert 9 < deadline.cap() <= 10
+
+def test_expired_deadline_never_caps_to_zero():
+    deadline = Deadline.after(-1)
+    assert deadline.expired
+    assert deadline.remaining() == 0
+    with pytest.raises(DeadlineExceeded):
+        deadline.cap(5)
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+def test_reserve_leaves_time_for_later_stages():
+    deadline = Deadline.after(10)
+    stage = deadline.reserve(4)
+    assert stage.expires_at == deadline.expires_at - 4
+    assert deadline.reserve(20).expired
+
+def test_wait_returns_result_within_budget():
+    async def answer():
+        return 42
+
+    assert asyncio.run(Deadline.after(1).wait(answer())) == 42
+
+def test_wait_raises_once_budget_runs_out():
+    async def scenario():
+        with pytest.raises(DeadlineExceeded):
+            await Deadline.after(0.05).wait(asyncio.sleep(5))
+
+    asyncio.run(scenario())
+
+def test_wait_on_expired_deadline_closes_the_coroutine():
+    started = []
+
+    async def work():
+        started.append(True)
+
+    coro = work()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(Deadline.after(-1).wait(coro))
+    assert not started
+    assert coro.cr_frame is None  # closed, so no "never awaited" warning
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from services.hedging import Hedger
+
+def make_hedger(**kwargs) -> Hedger:
+    options = {"enabled": True, "percentile": 50, "budget": 1.0, "min_samples": 1}
+    hedger = Hedger("test", **{**options, **kwargs})
+    hedger._latencies.extend([0.02] * 5)
+    return hedger
+
+class Attempts:
+    """attempt() callable whose n-th call sleeps delays[n] and records cancellation."""
+
+    def __init__(self, *delays: float, results=None):
+        self.delays = delays
+        self.results = results or [f"r{i}" for i in range(len(delays))]
+        self.started = 0
+        self.cancelled: list[int] = []
+
+    async def __call__(self):
+        index = self.started
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delays[index])
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+        result = self.results[index]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+def test_fast_attempt_is_not_hedged():
+    hedger = make_hedger()
+    attempts = Attempts(0.001)
+    assert asyncio.run(hedger.run(attempts)) == "r0"
+    assert attempts.started == 1
+    assert hedger.stats["hedged"] == 0
+
+def test_slow_attempt_is_hedged_and_the_loser_cancelled():
+    hedger = make_hedger()
+    attempts = Attempts(1.0, 0.01)
+    assert asyncio.run(hedger.run(attempts)) == "r1"
+    assert attempts.started == 2
+    assert attempts.cancelled == [0]
+    assert hedger.stats["hedged"] == 1
+    assert hedger.stats["hedge_wins"] == 1
+
+def test_first_attempt_can_still_win_after_the_hedge():
+    hedger = make_hedger()
+    attempts = Attempts(0.05, 1.0)
+    assert asyncio.run(hedger.run(attempts)) == "r0"
+    assert attempts.cancelled == [1]
+    assert hedger.stats["hedge_wins"] == 0
+
+def test_hedges_stay_within_budget():
+    hedger = make_hedger(budget=0.0)
+    attempts = Attempts(0.05)
+    assert asyncio.run(hedger.run(attempts)) == "r0"
+    assert attempts.started == 1
+    assert hedger.stats["over_budget"] == 1
+
+def test_no_hedging_until_enough_samples():
+    hedger = Hedger("test", enabled=True, min_samples=20)
+    assert hedger.hedge_delay() is None
+    attempts = Attempts(0.02)
+    asyncio.run(hedger.run(attempts))
+    assert attempts.started == 1
+
+def test_disabled_hedger_runs_one_attempt():
+    hedger = make_hedger(enabled=False)
+    attempts = Attempts(0.05)
+    assert asyncio.run(hedger.run(attempts)) == "r0"
+    assert attempts.started == 1
+
+def test_unusable_result_waits_for_the_other_attempt():
+    hedger = make_hedger()
+    attempts = Attempts(0.03, 0.06, results=[None, "r1"])
+    assert asyncio.run(hedger.run(attempts)) == "r1"
+
+def test_both_attempts_failing_raises():
+    hedger = make_hedger()
+    attempts = Attempts(0.03, 0.04, results=[ValueError("a"), ValueError("b")])
+    with pytest.raises(ValueError):
+        asyncio.run(hedger.run(attempts))
+
+def test_cancelling_the_caller_cancels_both_attempts():
+    async def scenario():
+        hedger = make_hedger()
+        attempts = Attempts(1.0, 1.0)
+        task = asyncio.create_task(hedger.run(attempts))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+        return attempts
+
+    attempts = asyncio.run(scenario())
+    assert sorted(attempts.cancelled) == [0, 1]
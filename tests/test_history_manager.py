@@ -0,0 +1,91 @@
+import asyncio
+
+from services.history_manager import HistoryManager, estimate_tokens
+
+def conversation(turns: int, words: int = 3) -> list[dict]:
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": " ".join([f"question{i}"] * words)})
+        messages.append({"role": "assistant", "content": " ".join([f"answer{i}"] * words)})
+    return messages
+
+def test_short_history_is_sent_verbatim():
+    async def scenario():
+        calls = []
+
+        async def summarize(prompt):
+            calls.append(prompt)
+            return "summary"
+
+        manager = HistoryManager(summarize, token_budget=1000, keep_turns=6)
+        messages = conversation(3)
+        summary, recent = manager.window("s", messages)
+        await asyncio.sleep(0)
+        return summary, recent, messages, calls
+
+    summary, recent, messages, calls = asyncio.run(scenario())
+    assert summary is None
+    assert recent == messages
+    assert calls == []
+
+def test_trimmed_messages_are_kept_until_the_summary_covers_them():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def summarize(prompt):
+            await release.wait()
+            return "they talked about questions 0 to 5"
+
+        manager = HistoryManager(summarize, token_budget=1000, keep_turns=4)
+        messages = conversation(6)
+        before = manager.window("s", messages)
+        release.set()
+        await asyncio.sleep(0.01)
+        after = manager.window("s", messages)
+        return messages, before, after, manager
+
+    messages, before, after, manager = asyncio.run(scenario())
+    # While the summary is being written nothing is lost from the prompt
+    assert before == (None, messages)
+    # Once it covers the older turns only the trimmed window is sent verbatim
+    summary, recent = after
+    assert summary == "they talked about questions 0 to 5"
+    assert recent == messages[-4:]
+    assert recent[0]["role"] == "user"
+    assert manager.snapshot()["refreshes"] == 1
+
+def test_window_stays_stable_between_trims():
+    async def scenario():
+        async def summarize(prompt):
+            return "summary"
+
+        manager = HistoryManager(summarize, token_budget=1000, keep_turns=4)
+        messages = conversation(6)
+        manager.window("s", messages)
+        await asyncio.sleep(0.01)
+        _, first = manager.window("s", messages)
+        messages += conversation(1)
+        _, second = manager.window("s", messages)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    # The next turn only appends, so the prompt prefix (and any context cache) still matches
+    assert second[:len(first)] == first
+    assert len(second) == len(first) + 2
+
+def test_unsummarized_backlog_is_bounded_when_the_summarizer_fails():
+    async def scenario():
+        async def summarize(prompt):
+            return None
+
+        manager = HistoryManager(summarize, token_budget=100, keep_turns=50)
+        messages = conversation(40, words=5)
+        summary, recent = manager.window("s", messages)
+        await asyncio.sleep(0.01)
+        return summary, recent, messages, manager
+
+    summary, recent, messages, manager = asyncio.run(scenario())
+    assert summary is None
+    assert sum(estimate_tokens(m["content"]) for m in recent) <= 2 * 100
+    assert recent == messages[-len(recent):]
+    assert manager.snapshot()["refresh_failures"] == 1
@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+import pytest
+
+from services.deadline import Deadline, DeadlineExceeded
+from services.provider_limits import ProviderLimiter, TokenBucket, is_overload
+
+def make_limiter(**kwargs) -> ProviderLimiter:
+    options = {"rate": 1000, "burst": 1000, "max_concurrency": 8, "initial_concurrency": 2}
+    return ProviderLimiter("test", **{**options, **kwargs})
+
+@pytest.mark.parametrize("status, error, expected", [
+    (429, None, True),
+    (503, None, True),
+    (400, None, False),
+    (200, None, False),
+    (None, asyncio.TimeoutError(), True),
+    (None, ValueError("bad"), False),
+])
+def test_is_overload(status, error, expected):
+    assert is_overload(status, error) is expected
+
+def test_token_bucket_allows_burst_then_paces():
+    async def scenario():
+        bucket = TokenBucket(rate=20, burst=2)
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert 0.03 < asyncio.run(scenario()) < 0.5
+
+def test_concurrency_window_queues_extra_calls():
+    async def scenario():
+        limiter = make_limiter()
+        first, second = await limiter.acquire(), await limiter.acquire()
+        third = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        queued = not third.done() and limiter.snapshot()["waiting"] == 1
+        first.release(status=200)
+        permit = await asyncio.wait_for(third, 1)
+        second.release(status=200)
+        permit.release(status=200)
+        return queued, limiter.inflight
+
+    queued, inflight = asyncio.run(scenario())
+    assert queued
+    assert inflight == 0
+
+def test_overload_halves_the_window_once_per_episode():
+    async def scenario():
+        limiter = make_limiter(initial_concurrency=8)
+        permits = [await limiter.acquire() for _ in range(4)]
+        for permit in permits:
+            permit.release(status=429)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.limit == 4
+    assert limiter.stats["decreases"] == 1
+    assert limiter.stats["overloads"] == 4
+
+def test_healthy_completions_grow_a_saturated_window():
+    async def scenario():
+        limiter = make_limiter(initial_concurrency=2)
+        for _ in range(10):
+            permits = [await limiter.acquire() for _ in range(2)]
+            for permit in permits:
+                permit.release(status=200)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.limit > 2
+    assert limiter.stats["increases"] > 0
+
+def test_release_is_idempotent():
+    async def scenario():
+        limiter = make_limiter()
+        permit = await limiter.acquire()
+        permit.release(status=200)
+        permit.release(status=500)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.inflight == 0
+    assert limiter.stats["overloads"] == 0
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        limiter = make_limiter(initial_concurrency=1)
+        held = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        held.release(status=200)
+        permit = await asyncio.wait_for(limiter.acquire(), 1)
+        permit.release(status=200)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.inflight == 0
+    assert limiter.snapshot()["waiting"] == 0
+
+def test_slot_wait_is_bounded_by_the_deadline():
+    async def scenario():
+        limiter = make_limiter(initial_concurrency=1)
+        held = await limiter.acquire()
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            async with limiter.slot(Deadline.after(0.05)):
+                pass
+        elapsed = time.monotonic() - started
+        held.release(status=200)
+        return limiter, elapsed
+
+    limiter, elapsed = asyncio.run(scenario())
+    assert elapsed < 0.5
+    assert limiter.inflight == 0
+
+def test_slot_reports_errors_to_the_window():
+    async def scenario():
+        limiter = make_limiter(initial_concurrency=4)
+        with pytest.raises(asyncio.TimeoutError):
+            async with limiter.slot():
+                raise asyncio.TimeoutError()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.inflight == 0
+    assert limiter.stats["overloads"] == 1
+    assert limiter.limit == 2
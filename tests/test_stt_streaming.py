@@ -0,0 +1,127 @@
+import asyncio
+import io
+import wave
+
+from aiohttp import web
+
+from services.deadline import Deadline
+from services.http_client import init_http_session, close_http_session
+from services import stt_streaming
+from services.stt_streaming import RealtimeAssemblyAIEngine, BatchAssemblyAIEngine
+from tools.fake_stt_server import build_app, BYTES_PER_WORD
+
+CHUNK = b"\x00\x00" * 1600  # 100 ms of 16 kHz PCM16
+
+async def pcm_chunks(seconds: float):
+    for _ in range(int(seconds * 10)):
+        yield CHUNK
+        await asyncio.sleep(0.005)
+
+async def run_engine(engine, chunks, deadline=None):
+    await init_http_session()
+    try:
+        return [event async for event in engine.transcribe_stream(chunks, deadline or Deadline())]
+    finally:
+        await close_http_session()
+
+async def with_fake_server(fn, **app_options):
+    runner = web.AppRunner(build_app(**app_options))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await fn(f"ws://127.0.0.1:{port}/v3/ws")
+    finally:
+        await runner.cleanup()
+
+def test_realtime_partials_then_one_final():
+    async def scenario(url):
+        return await run_engine(RealtimeAssemblyAIEngine(url=url), pcm_chunks(2))
+
+    events = asyncio.run(with_fake_server(scenario))
+    partials = [event.text for event in events if not event.final]
+    # Unformatted word-by-word partials, then the formatted end of turn
+    assert partials == ["this", "this is", "this is a", "this is a test", "This is a test."]
+    assert [event.final for event in events].count(True) == 1
+    assert events[-1].final and events[-1].text == "This is a test."
+
+def test_realtime_falls_back_to_batch_when_socket_drops(monkeypatch):
+    uploads = []
+
+    async def fake_transcribe(data, deadline=None):
+        uploads.append(data)
+        return "batch transcript"
+
+    monkeypatch.setattr(stt_streaming, "transcribe_audio_data", fake_transcribe)
+
+    async def scenario(url):
+        return await run_engine(RealtimeAssemblyAIEngine(url=url), pcm_chunks(2))
+
+    events = asyncio.run(with_fake_server(scenario, drop_after=BYTES_PER_WORD))
+    assert events[-1].final and events[-1].text == "batch transcript"
+    assert [event.final for event in events].count(True) == 1
+    # Every chunk, including those sent before the drop, reaches the batch upload as one WAV
+    with wave.open(io.BytesIO(uploads[0])) as w:
+        assert w.getframerate() == 16000
+        assert w.getnframes() * 2 == 20 * len(CHUNK)
+
+def test_realtime_stops_waiting_for_termination_at_deadline(monkeypatch):
+    async def never_called(data, deadline=None):
+        raise AssertionError("batch fallback must not run once the deadline has passed")
+
+    monkeypatch.setattr(stt_streaming, "transcribe_audio_data", never_called)
+
+    async def silent_server(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"type": "Turn", "transcript": "Hello there.", "end_of_turn": True,
+                            "turn_is_formatted": True})
+        async for _ in ws:
+            pass
+        return ws
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/v3/ws", silent_server)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        deadline = Deadline()
+
+        async def chunks():
+            async for chunk in pcm_chunks(0.3):
+                yield chunk
+            deadline.expires_at = Deadline.after(0.2).expires_at  # end of speech starts the budget
+
+        try:
+            started = asyncio.get_running_loop().time()
+            events = await run_engine(RealtimeAssemblyAIEngine(url=f"ws://127.0.0.1:{port}/v3/ws"),
+                                      chunks(), deadline)
+            return events, asyncio.get_running_loop().time() - started
+        finally:
+            await runner.cleanup()
+
+    events, elapsed = asyncio.run(scenario())
+    assert events[-1].final and events[-1].text == "Hello there."
+    assert elapsed < 2
+
+def test_batch_engine_passes_the_deadline(monkeypatch):
+    calls = []
+
+    async def fake_transcribe(data, deadline=None):
+        calls.append((data, deadline))
+        return "hello"
+
+    monkeypatch.setattr(stt_streaming, "transcribe_audio_data", fake_transcribe)
+    deadline = Deadline.after(5)
+
+    async def chunks():
+        yield b"ab"
+        yield b"cd"
+
+    events = asyncio.run(run_engine(BatchAssemblyAIEngine(), chunks(), deadline))
+    assert [(event.text, event.final) for event in events] == [("hello", True)]
+    assert calls == [(b"abcd", deadline)]
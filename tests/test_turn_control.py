@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from services.deadline import Deadline, DeadlineExceeded
+from services.turn_control import SessionTurnLocks, AdmissionController, Overloaded
+
+def test_turns_of_one_session_run_in_arrival_order():
+    async def scenario():
+        locks = SessionTurnLocks()
+        order = []
+
+        async def turn(name):
+            async with locks.hold("s"):
+                order.append(f"{name} start")
+                await asyncio.sleep(0.01)
+                order.append(f"{name} end")
+
+        await asyncio.gather(turn("a"), turn("b"), turn("c"))
+        return order, locks
+
+    order, locks = asyncio.run(scenario())
+    assert order == ["a start", "a end", "b start", "b end", "c start", "c end"]
+    assert locks.snapshot()["sessions"] == 0
+
+def test_unrelated_sessions_never_wait_on_each_other():
+    async def scenario():
+        locks = SessionTurnLocks()
+        running = set()
+        overlap = []
+
+        async def turn(session_id):
+            async with locks.hold(session_id):
+                running.add(session_id)
+                await asyncio.sleep(0.02)
+                overlap.append(len(running))
+                running.discard(session_id)
+
+        await asyncio.gather(*(turn(f"s{i}") for i in range(50)))
+        return max(overlap)
+
+    assert asyncio.run(scenario()) == 50
+
+def test_lock_wait_is_bounded_by_the_deadline():
+    async def scenario():
+        locks = SessionTurnLocks()
+        holding = asyncio.Event()
+
+        async def long_turn():
+            async with locks.hold("s"):
+                holding.set()
+                await asyncio.sleep(0.2)
+
+        first = asyncio.create_task(long_turn())
+        await holding.wait()
+        with pytest.raises(DeadlineExceeded):
+            async with locks.hold("s", Deadline.after(0.02)):
+                pass
+        waiting_after_timeout = locks.snapshot()["waiting"]
+        await first
+        return locks, waiting_after_timeout
+
+    locks, waiting_after_timeout = asyncio.run(scenario())
+    assert waiting_after_timeout == 0
+    assert locks.snapshot() == {"expired": 1, "sessions": 0, "waiting": 0}
+
+def test_admission_sheds_when_predicted_wait_is_too_long():
+    async def scenario():
+        admission = AdmissionController(max_inflight=1, max_queue_delay=0.5)
+        admission.latency.update(10.0)
+        async with admission.admit():
+            with pytest.raises(Overloaded) as shed:
+                async with admission.admit():
+                    pass
+        return admission, shed.value
+
+    admission, shed = asyncio.run(scenario())
+    assert admission.stats["rejected"] == 1
+    assert shed.retry_after_header == "10"
+
+def test_admission_wait_is_bounded_by_the_deadline():
+    async def scenario():
+        admission = AdmissionController(max_inflight=1, max_queue_delay=60)
+        async with admission.admit():
+            with pytest.raises(DeadlineExceeded):
+                async with admission.admit(Deadline.after(0.02)):
+                    pass
+        async with admission.admit(Deadline.after(1)):
+            pass
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.stats == {"admitted": 2, "rejected": 0, "expired": 1}
+    assert admission.inflight == 0 and admission.waiting == 0
@@ -0,0 +1,56 @@
+import asyncio
+
+from services.voice_pipeline import SentenceSegmenter, segment_stream
+
+def feed_all(segmenter: SentenceSegmenter, deltas: list[str]) -> list[str]:
+    sentences = []
+    for delta in deltas:
+        sentences += segmenter.feed(delta)
+    return sentences + segmenter.flush()
+
+def test_sentences_are_emitted_once_complete():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("Hello there, how are") == []
+    assert segmenter.feed(" you today? I am") == ["Hello there, how are you today?"]
+    assert segmenter.flush() == ["I am"]
+
+def test_sentence_needs_following_whitespace():
+    # "3." may still become "3.5", so nothing is cut before the next delta arrives
+    segmenter = SentenceSegmenter(min_chars=1)
+    assert segmenter.feed("It costs 3.") == []
+    assert segmenter.feed("5 dollars today. ") == ["It costs 3.5 dollars today."]
+
+def test_abbreviations_and_short_sentences_are_merged():
+    assert feed_all(SentenceSegmenter(), ["Dr. Smith is here. ", "Ok. ", "Then we can start now. "]) == [
+        "Dr. Smith is here.",
+        "Ok. Then we can start now.",
+    ]
+
+def test_closing_quotes_stay_with_their_sentence():
+    assert feed_all(SentenceSegmenter(), ['She said "go home now." ', "And so we did."]) == [
+        'She said "go home now."',
+        "And so we did.",
+    ]
+
+def test_long_runs_are_cut_at_a_clause_boundary():
+    segmenter = SentenceSegmenter(max_chars=40)
+    text = "first part of a long run, second part that keeps going and going"
+    sentences = segmenter.feed(text)
+    assert sentences == ["first part of a long run,"]
+    assert all(len(s) <= 40 for s in sentences + segmenter.flush())
+
+def test_long_runs_without_clauses_are_cut_at_a_space():
+    segmenter = SentenceSegmenter(max_chars=20)
+    sentences = feed_all(segmenter, ["one two three four five six seven eight"])
+    assert " ".join(sentences) == "one two three four five six seven eight"
+    assert all(len(s) <= 20 for s in sentences)
+
+def test_segment_stream():
+    async def deltas():
+        for delta in ["The first sentence is here. The sec", "ond one follows! And a tail"]:
+            yield delta
+
+    async def collect():
+        return [sentence async for sentence in segment_stream(deltas())]
+
+    assert asyncio.run(collect()) == ["The first sentence is here.", "The second one follows!", "And a tail"]
@@ -0,0 +1,57 @@
+"""
+Pre-build the fallback clip bundle so workers never call Murf at startup.
+
+    python tools/build_fallback_bundle.py [--voice en-IN-aarav] [--out static/fallback]
+
+Writes one mp3 per clip in services.fallback_audio.FALLBACK_CLIPS plus a
+manifest.json; ship the directory with the deployment image.
+"""
+import sys
+import json
+import asyncio
+import argparse
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+load_dotenv(ROOT / ".env")
+
+from services.http_client import init_http_session, close_http_session
+from services.fallback_audio import FallbackAudio, FALLBACK_CLIPS, FALLBACK_BUNDLE_DIR, FALLBACK_VOICE_ID
+from services.tts_service import generate_murf_audio, download_url_to_file, STATIC_DIR
+
+async def build(out_dir: Path, voice_id: str) -> int:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {"voice_id": voice_id, "clips": {}}
+    await init_http_session()
+    try:
+        for name, text in FALLBACK_CLIPS.items():
+            audio_url = await generate_murf_audio(text, voice_id=voice_id)
+            dest = out_dir / f"{name}.mp3"
+            if audio_url and audio_url.startswith("/static/"):
+                dest.write_bytes((STATIC_DIR / audio_url[len("/static/"):]).read_bytes())
+            elif not (audio_url and await download_url_to_file(audio_url, dest)):
+                print(f"Failed to synthesize clip {name!r}")
+                return 1
+            manifest["clips"][name] = {"file": dest.name, "text": text}
+            print(f"{name}: {dest}")
+    finally:
+        await close_http_session()
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    # Sanity check: the bundle loads the way the server will load it
+    loaded = FallbackAudio(bundle_dir=out_dir)._load_from_disk()
+    print(f"Bundle ready: {len(loaded)} clips in {out_dir}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voice", default=FALLBACK_VOICE_ID)
+    parser.add_argument("--out", type=Path, default=FALLBACK_BUNDLE_DIR)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(build(args.out, args.voice)))
+
+if __name__ == "__main__":
+    main()
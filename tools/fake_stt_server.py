@@ -0,0 +1,107 @@
+"""
+Local stand-in for AssemblyAI's realtime (v3) streaming socket.
+
+Speaks the same message types the realtime engine expects (Begin, Turn,
+Termination) and "transcribes" by emitting one word of a canned sentence per
+half second of PCM received, so the streaming STT path can be exercised offline
+(tests/test_stt_streaming.py runs the engine against it):
+
+    python tools/fake_stt_server.py --port 8765
+    STT_ENGINE=realtime ASSEMBLYAI_API_KEY=fake \\
+        ASSEMBLYAI_REALTIME_URL=ws://127.0.0.1:8765/v3/ws uvicorn main:app
+
+    python tools/fake_stt_server.py --demo   # run the engine against it and print events
+"""
+import sys
+import json
+import uuid
+import asyncio
+import argparse
+from pathlib import Path
+
+from aiohttp import web, WSMsgType
+
+CANNED_WORDS = "this is a test transcript from the fake streaming server".split()
+BYTES_PER_WORD = 16000  # 0.5 s of 16 kHz mono s16le
+DROP_AFTER = web.AppKey("drop_after", object)
+
+async def realtime_ws(request: web.Request):
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    await ws.send_json({"type": "Begin", "id": uuid.uuid4().hex, "expires_at": 0})
+
+    received = 0
+    turn_order = 0
+    words: list[str] = []
+    drop_after = request.app[DROP_AFTER]
+    async for msg in ws:
+        if msg.type == WSMsgType.BINARY:
+            received += len(msg.data)
+            if drop_after is not None and received > drop_after:
+                break  # simulate the socket failing mid-utterance
+            n_words = min(received // BYTES_PER_WORD, len(CANNED_WORDS))
+            if n_words > len(words):
+                words = CANNED_WORDS[:n_words]
+                await ws.send_json({
+                    "type": "Turn",
+                    "turn_order": turn_order,
+                    "transcript": " ".join(words),
+                    "end_of_turn": False,
+                    "turn_is_formatted": False,
+                })
+        elif msg.type == WSMsgType.TEXT:
+            if json.loads(msg.data).get("type") == "Terminate":
+                if words:
+                    await ws.send_json({
+                        "type": "Turn",
+                        "turn_order": turn_order,
+                        "transcript": " ".join(words).capitalize() + ".",
+                        "end_of_turn": True,
+                        "turn_is_formatted": True,
+                    })
+                await ws.send_json({"type": "Termination", "audio_duration_seconds": received / 32000})
+                break
+        else:
+            break
+    await ws.close()
+    return ws
+
+def build_app(drop_after: int | None = None) -> web.Application:
+    """The fake server; with drop_after it closes the socket once that many PCM bytes arrived."""
+    app = web.Application()
+    app[DROP_AFTER] = drop_after
+    app.router.add_get("/v3/ws", realtime_ws)
+    return app
+
+async def run_demo(port: int):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from services.http_client import close_http_session
+    from services.stt_streaming import RealtimeAssemblyAIEngine
+
+    runner = web.AppRunner(build_app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    async def silence(seconds: float, chunk_ms: int = 100):
+        chunk = b"\x00\x00" * (16 * chunk_ms)
+        for _ in range(int(seconds * 1000 / chunk_ms)):
+            yield chunk
+            await asyncio.sleep(0)
+
+    engine = RealtimeAssemblyAIEngine(url=f"ws://127.0.0.1:{port}/v3/ws")
+    try:
+        async for event in engine.transcribe_stream(silence(3)):
+            print("final  " if event.final else "partial", event.text)
+    finally:
+        await close_http_session()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--demo", action="store_true", help="run the realtime engine against the fake server")
+    args = parser.parse_args()
+    if args.demo:
+        asyncio.run(run_demo(args.port))
+    else:
+        web.run_app(build_app(), host="127.0.0.1", port=args.port)